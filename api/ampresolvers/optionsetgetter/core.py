@@ -2,14 +2,19 @@ from fastapi.param_functions import Query
 from api.utils import cached
 from api.types import ClassName
 from api.models import OptionSetList, OptionSetRecord, OptionSetRecords
-from collections import defaultdict
-from typing import Any, DefaultDict, Dict, List, Set, Tuple
-from db.models import Glossary, Place, Policy
+from datetime import datetime
+from typing import Any, Dict, List, Set, Tuple
+from db.models import Place, Policy, Version
 from pony.orm.core import count, db_session, select
 
 from db import db
 
 
+# indices of the value and its parent (group) in place tuples selected as
+# (area1, area2, country_name), by geographic field
+GEO_GROUP_INDICES: Dict[str, Tuple[int, int]] = {"area1": (0, 2), "area2": (1, 0)}
+
+
 class OptionSetGetter:
     def __init__(self) -> None:
         """Define new OptionSetGetter"""
@@ -252,7 +257,6 @@ class OptionSetGetter:
         return cat_subcat_optionsets
 
     @db_session
-    # @cached
     def get_optionset(
         self,
         fields: list = list(),
@@ -286,7 +290,30 @@ class OptionSetGetter:
             response dictionary
 
         """
+        return self.__get_optionset_for_version(
+            fields=fields,
+            class_name=class_name,
+            geo_res=geo_res,
+            state_name=state_name,
+            iso3=iso3,
+            last_update=Version.get_last_update(),
+        )
 
+    @cached
+    @db_session
+    def __get_optionset_for_version(
+        self,
+        fields: list,
+        class_name: str,
+        geo_res: str,
+        state_name: str,
+        iso3: str,
+        last_update: datetime,
+    ):
+        """Returns the optionsets as `get_optionset` does, for the data as of
+        their last update, so responses are reused until new data are
+        ingested.
+        """
         # define which data fields use groups
         # TODO dynamically
         fields_using_groups = (
@@ -298,10 +325,18 @@ class OptionSetGetter:
         # define output data dict
         data = dict()
 
-        # get all glossary terms if needed
+        # get all glossary terms if needed, indexed once for all fields by the
+        # info needed to identify the parent term of an option
         need_glossary_terms = any(d_str in fields_using_groups for d_str in fields)
-        glossary_terms = (
-            select(i for i in db.Glossary)[:][:] if need_glossary_terms else list()
+        glossary_parents: Dict[Tuple[str, str, str], str] = (
+            {
+                (term_entity_name, term_field, subterm): term
+                for term_entity_name, term_field, subterm, term in select(
+                    (i.entity_name, i.field, i.subterm, i.term) for i in db.Glossary
+                )
+            }
+            if need_glossary_terms
+            else dict()
         )
 
         # check places relevant only for the entity of `class_name`
@@ -414,14 +449,17 @@ class OptionSetGetter:
                 else:
                     options = options_tmp
 
-            options.sort()
-            options.sort(key=lambda x: x != "Face mask")
-            options.sort(key=lambda x: x != "Social distancing")
-            options.sort(key=lambda x: x == "Other")
-            options.sort(key=lambda x: x in ("Unspecified", "Local"))
-
-            # skip blank strings
-            options = list(filter(lambda x: x.strip() != "", options))
+            # skip blank strings before sorting the rest
+            options = [x for x in options if x.strip() != ""]
+            options.sort(
+                key=lambda x: (
+                    x in ("Unspecified", "Local"),
+                    x == "Other",
+                    x != "Social distancing",
+                    x != "Face mask",
+                    x,
+                )
+            )
 
             # assign groups, if applicable
             uses_custom_groups: bool = entity_name_and_field == "Place.country_name"
@@ -431,73 +469,32 @@ class OptionSetGetter:
             if uses_custom_groups:
                 options = options_tmp
             elif uses_nongeo_groups:
-                options_with_groups = list()
-
-                # index glossary terms by info needed to identify parent terms
-                glossary_terms_grouped: DefaultDict = defaultdict(
-                    lambda: defaultdict(dict)
-                )
-                term: Glossary = None
-                for term in glossary_terms:
-                    glossary_terms_grouped[term.entity_name][term.field][
-                        term.subterm
-                    ] = term
-
-                option: Any = None
-                for option in options:
-                    # get group from glossary data
-                    parent = glossary_terms_grouped[entity_name][field].get(
-                        option, None
-                    )
-
-                    # if a parent was found use its term as the group,
-                    # otherwise specify "Other" as the group
-                    if parent:
-                        options_with_groups.append([option, parent.term])
-                    else:
-                        # TODO decide best way to handle "Other" cases
-                        options_with_groups.append([option, "Other"])
-                options = options_with_groups
+                # use the parent term from glossary data as the group if one
+                # was found, otherwise specify "Other" as the group
+                # TODO decide best way to handle "Other" cases
+                options = [
+                    [
+                        option,
+                        glossary_parents.get((entity_name, field, option), "Other"),
+                    ]
+                    for option in options
+                ]
             elif uses_geo_groups:
-                options_with_groups = list()
-
-                if field == "area1":
-                    places_by_area1: dict = {}
-                    p: tuple = None
-                    for p in place_tuples:
-                        if p[2] == "N/A":
-                            continue
-                        else:
-                            places_by_area1[p[0]] = p
-                    for option in options:
-                        # get group from glossary data
-                        parent = places_by_area1.get(option, None)
-
-                        # if a parent was found use its term as the group,
-                        # otherwise specify "Other" as the group
-                        if parent:
-                            options_with_groups.append([option, parent[2]])
-                        else:
-                            continue
-                elif field == "area2":
-                    places_by_area1: dict = {}
-                    p: tuple = None
-                    for p in place_tuples:
-                        if p[2] == "N/A":
-                            continue
-                        else:
-                            places_by_area1[p[1]] = p
-                    option: Any = None
-                    for option in options:
-                        # get group from glossary data
-                        parent = places_by_area1.get(option, None)
-
-                        # if a parent was found use its term as the group,
-                        # otherwise specify "Other" as the group
-                        if parent:
-                            options_with_groups.append([option, parent[0]])
-                        else:
-                            continue
+                # get the parent of each place value from its place tuple,
+                # skipping places without a country
+                value_index, parent_index = GEO_GROUP_INDICES[field]
+                parents_by_value: Dict[str, str] = {
+                    p[value_index]: p[parent_index]
+                    for p in place_tuples
+                    if p[2] != "N/A"
+                }
+
+                # use the parent as the group, skipping values without one
+                options_with_groups = [
+                    [option, parents_by_value[option]]
+                    for option in options
+                    if option in parents_by_value
+                ]
 
                 options = options_with_groups
 
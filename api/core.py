@@ -1,18 +1,17 @@
 """Define API data processing methods"""
 # standard modules
-from typing import Any, List, Set
+from typing import Any, DefaultDict, FrozenSet, List, Set, Tuple
 
-import math
-import itertools
+import hashlib
 import logging
 import os
-import pprint
 from io import BytesIO
-from datetime import datetime, date, timedelta
+from datetime import date, datetime, timedelta
 from collections import defaultdict
 
 # 3rd party modules
-import boto3
+from botocore.exceptions import BotoCoreError, ClientError
+from cachetools.func import ttl_cache
 from pony.orm import (
     db_session,
     select,
@@ -21,42 +20,73 @@ from pony.orm import (
     count,
     raw_sql,
     exists,
-    group_concat,
 )
 from fastapi import HTTPException
-from fastapi.responses import Response
-from fuzzywuzzy import fuzz
-from pony.orm.core import Query, ObjectNotFound
+from fastapi.responses import RedirectResponse, StreamingResponse
+from starlette.background import BackgroundTask
+from rapidfuzz import fuzz, process
+from pony.orm.core import Query
 
 # local modules
+from . import helpers
 from .export import CovidPolicyExportPlugin
 from .routing import GeoRes
 from .utils import cached
 from .models import (
+    Court_Challenge,
     Policy,
-    PolicyList,
-    PolicyDict,
-    PolicyStatus,
     PolicyStatusList,
     Place,
-    PlanList,
-    ChallengeList,
-    PolicyNumber,
-    PolicyNumberList,
+    Plan,
     ListResponse,
 )
-from .utils import download_file
+from .utils import (
+    apply_keyset_pagination,
+    apply_ordering,
+    download_file,
+    get_cache_key,
+    get_keyset_ordering,
+    get_next_cursor,
+    get_page,
+    is_keyset_ordering,
+    iter_chunks,
+    pad_in_values,
+    str_to_date,
+)
 from ingest import awss3
 from db import db
 
 # constants
-s3 = boto3.client("s3")
 S3_BUCKET_NAME = awss3.S3_BUCKET_NAME
+STREAM_CHUNK_SIZE: int = 64 * 1024
+EXPORT_S3_PREFIX: str = awss3.EXPORT_S3_PREFIX
+FILE_URL_EXPIRES_IN: int = 300
+VERSION_CACHE_TTL: int = 60
 
-# pretty printing: for printing JSON objects legibly
-pp = pprint.PrettyPrinter(indent=4)
 IS_DEV: bool = os.environ.get("env", None) == "dev"
 
+# number of threads used to score text matches; -1 uses all CPUs, which may
+# contend with other requests served by the same process
+FUZZY_MATCH_WORKERS: int = int(os.environ.get("FUZZY_MATCH_WORKERS", "1"))
+
+# date fields filtered by a date range, inclusive
+DATE_FIELDS: Set[str] = {
+    "date_start_effective",
+    "date_end_anticipated",
+    "date_end_actual",
+    "date_issued",
+    "date_of_decision",
+    "date_of_complaint",
+}
+
+# fields filtered by joining to the place entity
+PLACE_JOIN_FIELDS: FrozenSet[str] = frozenset(
+    {"level", "loc", "area1", "iso3", "country_name", "area2", "ansi_fips"}
+)
+
+# place levels that make a policy at least state-level
+STATE_OR_COUNTRY_LEVELS: Tuple[str, ...] = ("State / Province", "Country")
+
 # IMPLEMENTED_NO_RESTRICTIONS = False
 
 
@@ -89,7 +119,6 @@ def get_countries_with_policies():
 
 
 @db_session
-@cached
 def export(filters: dict = None, class_name: str = "Policy"):
     """Return XLSX data export for policies with the given filters applied.
 
@@ -100,8 +129,8 @@ def export(filters: dict = None, class_name: str = "Policy"):
 
     Returns
     -------
-    fastapi.responses.Response
-        The XLSX data export file.
+    fastapi.responses.StreamingResponse
+        The XLSX data export file, streamed in chunks.
 
     """
     media_type = (
@@ -113,48 +142,285 @@ def export(filters: dict = None, class_name: str = "Policy"):
         suffix: str = " (summary)" if class_name == "all_static_summary" else ""
         suffix_name: str = " (summary)" if class_name == "all_static_summary" else " "
         today = date.today()
+        filename: str = (
+            f"COVID AMP - Full Data Export{suffix_name}- {today.strftime('%Y%m%d')}"
+        )
         file = download_file(
             "https://ghssidea.org/downloads/"
             f"COVID AMP - Policy and Plan Data Export{suffix}.xlsx",
-            f"COVID AMP - Full Data Export{suffix_name}- "
-            + str(today).replace("-", ""),
+            filename,
             None,
             as_object=True,
+            stream=True,
         )
-        return Response(
-            content=file, media_type=media_type, headers={"cache-control": "no-cache"}
+        if not file:
+            raise HTTPException(status_code=404, detail="Static export not found")
+        return StreamingResponse(
+            file.iter_content(chunk_size=STREAM_CHUNK_SIZE),
+            media_type=media_type,
+            headers={
+                "cache-control": "no-cache",
+                "content-disposition": f'attachment; filename="{filename}.xlsx"',
+            },
         )
     else:
-        # Create Excel export file
-        genericExcelExport = CovidPolicyExportPlugin(db, filters, class_name)
-        content = genericExcelExport.build()
-
-        return Response(
-            content=content,
+        # if the Excel export file was already built for these filters and
+        # the current data, stream it from S3
+        last_update: datetime = db.Version.get_last_update()
+        key: str = get_export_key(
+            filters=filters, class_name=class_name, last_update=last_update
+        )
+        etag: str = get_export_etag(
+            filters=filters, class_name=class_name, last_update=last_update
+        )
+        try:
+            obj: dict = awss3.get_s3_client().get_object(Bucket=S3_BUCKET_NAME, Key=key)
+            return StreamingResponse(
+                obj["Body"].iter_chunks(chunk_size=STREAM_CHUNK_SIZE),
+                media_type=media_type,
+                headers={
+                    "cache-control": "no-cache",
+                    "content-length": str(obj["ContentLength"]),
+                    "etag": etag,
+                },
+            )
+        except ClientError as e:
+            if e.response["Error"]["Code"] != "NoSuchKey":
+                logging.exception(e)
+        except BotoCoreError as e:
+            logging.exception(e)
+
+        # otherwise create Excel export file and stream it from its buffer,
+        # saving it to S3 for later requests once the response is sent
+        content: BytesIO = get_export_content(
+            filters=filters, class_name=class_name, last_update=last_update
+        )
+        return StreamingResponse(
+            iter_chunks(content, chunk_size=STREAM_CHUNK_SIZE),
             media_type=media_type,
-            headers={"cache-control": "no-cache"},
+            headers={
+                "cache-control": "no-cache",
+                "content-length": str(content.getbuffer().nbytes),
+                "etag": etag,
+            },
+            background=BackgroundTask(save_export, key=key, content=content),
+        )
+
+
+def get_export_digest(
+    filters: dict = None, class_name: str = "Policy", last_update: datetime = None
+) -> str:
+    """Returns the digest identifying the XLSX data export for the given class
+    with the given filters applied, which changes whenever the data are
+    ingested.
+
+    Parameters
+    ----------
+    filters : dict
+        The filters to apply.
+    class_name : str
+        The name of the class to export.
+    last_update : datetime
+        The time the data were last ingested, from `get_last_update`.
+
+    Returns
+    -------
+    str
+        The digest.
+
+    """
+    return hashlib.sha256(
+        get_cache_key(
+            dict(
+                filters=filters,
+                class_name=class_name,
+                last_update=last_update,
+            )
+        ).encode("utf-8")
+    ).hexdigest()
+
+
+def get_export_key(
+    filters: dict = None, class_name: str = "Policy", last_update: datetime = None
+) -> str:
+    """Returns the S3 key of the XLSX data export for the given class with the
+    given filters applied (see `get_export_digest`).
+
+    Parameters
+    ----------
+    filters : dict
+        The filters to apply.
+    class_name : str
+        The name of the class to export.
+    last_update : datetime
+        The time the data were last ingested, from `get_last_update`.
+
+    Returns
+    -------
+    str
+        The S3 key.
+
+    """
+    digest: str = get_export_digest(
+        filters=filters, class_name=class_name, last_update=last_update
+    )
+    return f"{EXPORT_S3_PREFIX}{digest}.xlsx"
+
+
+def get_export_etag(
+    filters: dict = None, class_name: str = "Policy", last_update: datetime = None
+) -> str:
+    """Returns the entity tag of the XLSX data export for the given class with
+    the given filters applied (see `get_export_digest`).
+
+    Parameters
+    ----------
+    filters : dict
+        The filters to apply.
+    class_name : str
+        The name of the class to export.
+    last_update : datetime
+        The time the data were last ingested, from `get_last_update`.
+
+    Returns
+    -------
+    str
+        The quoted entity tag.
+
+    """
+    digest: str = get_export_digest(
+        filters=filters, class_name=class_name, last_update=last_update
+    )
+    return '"' + digest + '"'
+
+
+def save_export(key: str, content: BytesIO):
+    """Saves the XLSX data export to S3 at the given key, so later requests
+    for the same export are served without building it. Errors are logged
+    but not raised, since the export has already been sent.
+
+    Parameters
+    ----------
+    key : str
+        The S3 key, from `get_export_key`.
+    content : BytesIO
+        The XLSX data export file, as returned by `get_export_content`.
+
+    """
+    try:
+        awss3.get_s3_client().put_object(
+            Bucket=S3_BUCKET_NAME, Key=key, Body=content.getvalue()
         )
+    except Exception as e:
+        logging.exception(e)
+
+
+@db_session
+@cached
+def get_export_content(
+    filters: dict = None, class_name: str = "Policy", last_update: datetime = None
+) -> BytesIO:
+    """Return buffer containing XLSX data export for the given class with the
+    given filters applied.
+
+    Parameters
+    ----------
+    filters : dict
+        The filters to apply.
+    class_name : str
+        The name of the class to export.
+    last_update : datetime
+        The time the data were last ingested, from `get_last_update`, which
+        makes cached exports expire when new data are ingested. It is not
+        otherwise used.
+
+    Returns
+    -------
+    BytesIO
+        The XLSX data export file, at the start of the buffer. It must not be
+        read from directly, since it may be shared between requests.
+
+    """
+    genericExcelExport = CovidPolicyExportPlugin(db, filters, class_name)
+    return genericExcelExport.build(io=BytesIO())
 
 
+@ttl_cache(maxsize=1, ttl=VERSION_CACHE_TTL)
 @db_session
 def get_version():
-    data_tmp = db.Version.select_by_sql(
+    # versions only change when data are ingested, so the response is reused
+    # for up to `VERSION_CACHE_TTL` seconds (see decorator)
+
+    # get the latest version of each data type as tuples, without creating
+    # Version entity instances
+    rows = db.execute(
         """
-        SELECT distinct on ("name") * FROM "version"
+        SELECT DISTINCT ON ("name") "name", "date", "last_datum_date", "map_types"
+        FROM "version"
+        ORDER BY "name", "date" DESC
         """
-    )
+    ).fetchall()
     data = [
-        i.to_dict(only=["name", "date", "last_datum_date", "map_types"])
-        for i in data_tmp
+        {
+            "name": name,
+            "date": version_date,
+            "last_datum_date": last_datum_date,
+            "map_types": map_types.replace("{", "").replace("}", "").split(","),
+        }
+        for name, version_date, last_datum_date, map_types in rows
     ]
-    d: dict = None
-    for d in data:
-        d["map_types"] = d["map_types"].replace("{", "").replace("}", "").split(",")
-    data.sort(key=lambda x: x["name"], reverse=True)
-    data.sort(key=lambda x: x["date"], reverse=True)
+    data.sort(key=lambda x: (x["date"], x["name"]), reverse=True)
     return {"success": True, "data": data, "message": "Success"}
 
 
+@db_session
+def get_last_update() -> datetime:
+    """Returns the time the policy data were last ingested, which versions
+    cached responses, exported files and entity tags. Ingesting caseload data
+    does not change it (see `Version.get_last_update`).
+
+    Returns
+    -------
+    datetime
+        The time the policy data were last ingested.
+
+    """
+    return db.Version.get_last_update()
+
+
+def get_etag(
+    path: str, query_params: List[Tuple[str, str]], last_update: datetime
+) -> str:
+    """Returns the entity tag of the response to a GET request, which is the
+    same for requests with the same path and query parameters until new data
+    are ingested.
+
+    Parameters
+    ----------
+    path : str
+        The path of the request.
+    query_params : List[Tuple[str, str]]
+        The query parameters of the request as key-value pairs.
+    last_update : datetime
+        The time the data were last ingested, from `get_last_update`. It must
+        be the value the response is built for.
+
+    Returns
+    -------
+    str
+        The quoted entity tag.
+
+    """
+    key: str = get_cache_key(
+        {
+            "path": path,
+            "query_params": sorted(query_params),
+            "last_update": last_update,
+        }
+    )
+    return '"' + key + '"'
+
+
 @db_session
 def get_count(class_names):
     """Return the number of instances for entities in the db, if they are
@@ -184,13 +450,46 @@ def get_count(class_names):
 
 @db_session
 def get_metadata(fields: list, entity_class_name: str):
-    """Returns Metadata instance fields for the fields specified.
+    """Returns Metadata instance fields for the fields specified, reusing the
+    response for the same fields until new data are ingested.
+
+    Parameters
+    ----------
+    fields : list
+        List of fields as strings with entity name prefixed, e.g.,
+        `policy.id`.
+
+    Returns
+    -------
+    dict
+        Response containing metadata information for the fields.
+
+    """
+    return get_metadata_for_version(
+        fields=fields,
+        entity_class_name=entity_class_name,
+        last_update=db.Version.get_last_update(),
+    )
+
+
+@cached
+@db_session
+def get_metadata_for_version(
+    fields: list, entity_class_name: str, last_update: datetime
+):
+    """Returns Metadata instance fields for the fields specified, as of the
+    last update of the data.
 
     Parameters
     ----------
     fields : list
         List of fields as strings with entity name prefixed, e.g.,
         `policy.id`.
+    entity_class_name : str
+        The name of the class the metadata describe.
+    last_update : datetime
+        The time the data were last ingested, which makes cached responses
+        expire when new data are ingested.
 
     Returns
     -------
@@ -201,11 +500,9 @@ def get_metadata(fields: list, entity_class_name: str):
     # define output data dict
     data = dict()
 
-    # for each field for which metadat is needed
-    n = 0
+    # get entity name and field of each field for which metadata is needed
+    pairs: List[Tuple[str, str]] = list()
     for d in fields:
-
-        # get entity class name and field
         try:
             entity_name, field = d.split(".")
         except Exception:
@@ -215,17 +512,27 @@ def get_metadata(fields: list, entity_class_name: str):
                 ' "Policy.policy_name"',
                 "data": [],
             }
-
-        # get metadata instance from db that matches this field
-        metadatum = get(
+        pairs.append((entity_name.lower(), field))
+
+    # get all matching metadata instances from db in one query, indexed by
+    # their lowercase entity name and field
+    entity_names: Set[str] = {entity_name for entity_name, _ in pairs}
+    field_names: Set[str] = {field for _, field in pairs}
+    metadata_by_pair: dict = {
+        (i.entity_name.lower(), i.field): i
+        for i in select(
             i
             for i in db.Metadata
-            if i.field == field
-            and i.entity_name.lower() == entity_name.lower()
-            and i.class_name == entity_class_name
+            if i.class_name == entity_class_name
+            and i.entity_name.lower() in entity_names
+            and i.field in field_names
         )
+    }
 
-        # store metadata fields in output data if they exist
+    # store metadata fields in output data if they exist
+    n = 0
+    for d, pair in zip(fields, pairs):
+        metadatum = metadata_by_pair.get(pair)
         if metadatum is not None:
             data[d] = metadatum.to_dict()
             n += 1
@@ -257,60 +564,62 @@ def get_file_title(id: int):
 
     """
 
-    # define filename from File instance field
-    try:
-        file = db.File[id]
-    except ObjectNotFound:
+    # get file title from File instance field, without loading the instance
+    names: list = select(i.name for i in db.File if i.id == id)[:]
+    if len(names) == 0:
         raise HTTPException(
             status_code=404, detail="No file found with ID = " + str(id)
         )
-    return file.name
+    return names[0]
 
 
 @db_session
-def get_file(id: int):
-    """Serves the file from S3 that corresponds to the File instances with
-    the specified id.
+def get_file(id: int, title: str = None):
+    """Redirects to a pre-signed S3 URL for the file that corresponds to the
+    File instance with the specified id, so the file is downloaded from S3
+    directly rather than through the API.
 
     Parameters
     ----------
     id : int
         Unique ID of the File instance which corresponds to the S3 file to
         be served.
+    title : str, optional
+        Filename given to the file when it is downloaded, by default its key.
 
     Returns
     -------
-    fastapi.responses.Response
-        The file.
+    fastapi.responses.RedirectResponse
+        The redirect to the file in S3.
 
     """
 
-    # define filename from File instance field
-    file = db.File[id]
-    key = file.filename
-
-    # retrieve file and write it to IO file object `data`
-    # if the file is not found in S3, return a 404 error
-    data = BytesIO()
-    try:
-        s3.download_fileobj(S3_BUCKET_NAME, key, data)
-    except Exception as e:
-        logging.exception(e)
-        return "Document not found (404)"
-
-    # return to start of IO stream
-    data.seek(0)
-
-    # return export file
-    content = data.read()
+    # define filename from File instance field, without loading the instance
+    keys: list = select(i.filename for i in db.File if i.id == id)[:]
+    if len(keys) == 0:
+        raise HTTPException(
+            status_code=404, detail="No file found with ID = " + str(id)
+        )
+    key = keys[0]
+    if key is None:
+        raise HTTPException(status_code=404, detail="Document not found")
 
-    # return file with correct media type given its extension
+    # serve file with correct media type given its extension
     media_type = "application"
     if key.endswith(".pdf"):
         media_type = "application/pdf"
-    return Response(
-        content=content, media_type=media_type, headers={"cache-control": "no-cache"}
+    filename: str = (title if title is not None else key).replace('"', "")
+    url: str = awss3.get_s3_client().generate_presigned_url(
+        "get_object",
+        Params={
+            "Bucket": S3_BUCKET_NAME,
+            "Key": key,
+            "ResponseContentDisposition": f'inline; filename="{filename}"',
+            "ResponseContentType": media_type,
+        },
+        ExpiresIn=FILE_URL_EXPIRES_IN,
     )
+    return RedirectResponse(url, status_code=302)
 
 
 @db_session
@@ -324,6 +633,7 @@ def get_policy_number(
     ordering: list = [],
     page: int = None,
     pagesize: int = 100,
+    cursor: str = None,
 ):
 
     # return all fields?
@@ -335,6 +645,9 @@ def get_policy_number(
     if use_pagination and (page is None or page == 0):
         page = 1
 
+    # use keyset pagination instead of page numbers if a cursor was provided
+    use_keyset: bool = use_pagination and cursor is not None
+
     # get base query
     entity_class = db.Policy_Number
     q = select(i for i in entity_class)
@@ -343,19 +656,19 @@ def get_policy_number(
     if filters is not None:
         q = apply_entity_filters(q, entity_class, filters)
 
-    # apply ordering
+    # apply ordering, and the cursor if using keyset pagination
+    keyset_field: str = None
+    if use_keyset:
+        keyset_field, _ = get_keyset_ordering(entity_class, ordering)
+        q = apply_keyset_pagination(q, entity_class, ordering, cursor)
+        ordering = list()
     ordering.reverse()
     for field_tmp, direction in ordering:
         if "place." in field_tmp:
             field = field_tmp.split(".")[1]
-            if direction == "desc":
-                q = q.order_by(
-                    lambda i: desc(group_concat(getattr(p, field) for p in i.place))
-                )
-            else:
-                q = q.order_by(
-                    lambda i: group_concat(getattr(p, field) for p in i.place)
-                )
+            q = q.order_by(
+                raw_sql(get_place_ordering_sql(entity_class, field, direction))
+            )
         else:
             field = field_tmp
             if direction == "desc":
@@ -363,12 +676,18 @@ def get_policy_number(
             else:
                 q = q.order_by(getattr(entity_class, field))
 
-    # get len of query
-    n = count(q) if use_pagination else None
+    # load linked entities of the returned policy numbers in bulk
+    q = q.prefetch(entity_class.policy, entity_class.place, entity_class.auth_entity)
 
-    # apply pagination if using
-    if use_pagination:
-        q = q.page(page, pagesize=pagesize)
+    # apply pagination if using, getting the len of the query only if it
+    # cannot be determined from the page; keyset pagination fetches one extra
+    # record to determine whether there are more pages instead
+    n = None
+    more_pages: bool = False
+    if use_keyset:
+        q = q.limit(pagesize + 1)
+    elif use_pagination:
+        q, n, more_pages = get_page(q, page, pagesize)
 
     # return query object if arguments requested it
     if return_db_instances:
@@ -376,6 +695,14 @@ def get_policy_number(
 
     # otherwise prepare list of dictionaries to return
     else:
+        # if using keyset pagination, drop the extra record fetched
+        next_cursor: str = None
+        if use_keyset:
+            q = q[:]
+            if len(q) > pagesize:
+                q = q[:pagesize]
+                next_cursor = get_next_cursor(q[-1], keyset_field)
+
         return_fields_by_entity = defaultdict(list)
         if fields is not None:
             return_fields_by_entity["policy_number"] = fields
@@ -409,31 +736,37 @@ def get_policy_number(
                 related_objects=True,
                 return_fields_by_entity=return_fields_by_entity,
             )
-            datum = PolicyNumber(
-                policy_number=d_dict["id"],
-                titles=d_dict["names"],
-                auth_entity_offices=[ae.office for ae in d_dict["auth_entity"]],
-                policies=[
-                    Policy(
-                        id=p.id,
-                        primary_ph_measure=p.primary_ph_measure,
-                        ph_measure_details=p.ph_measure_details,
-                        date_start_effective=p.date_start_effective,
-                    )
+            datum = {
+                "policy_number": d_dict["id"],
+                "titles": d_dict["names"],
+                "auth_entity_offices": [ae.office for ae in d_dict["auth_entity"]],
+                "policies": [
+                    {
+                        "id": p.id,
+                        "primary_ph_measure": p.primary_ph_measure,
+                        "ph_measure_details": p.ph_measure_details,
+                        "date_start_effective": p.date_start_effective,
+                    }
                     for p in d_dict["policy"]
                 ],
-            )
+            }
             data.append(datum)
 
         # if pagination is being used, get next page URL if there is one
-        n_pages = None if not use_pagination else math.ceil(n / pagesize)
-        more_pages = use_pagination and page < n_pages
-        next_page_url = (
-            None
-            if not more_pages
-            else f"""/get/policy_number?page={str(page + 1)}"""
-            f"""&pagesize={str(pagesize)}"""
-        )
+        if use_keyset:
+            next_page_url = (
+                None
+                if next_cursor is None
+                else f"""/get/policy_number?cursor={next_cursor}"""
+                f"""&pagesize={str(pagesize)}"""
+            )
+        else:
+            next_page_url = (
+                None
+                if not more_pages
+                else f"""/get/policy_number?page={str(page + 1)}"""
+                f"""&pagesize={str(pagesize)}"""
+            )
 
         # if by category: transform data to organize by category
         # NOTE: assumes one `primary_ph_measure` per Policy
@@ -452,13 +785,13 @@ def get_policy_number(
             # )
         else:
             # create response from output list
-            res = PolicyNumberList(
-                data=data,
-                success=True,
-                message=f"""{len(q)} policy numbers found""",
-                next_page_url=next_page_url,
-                n=n,
-            )
+            res = {
+                "success": True,
+                "message": f"""{len(data)} policy numbers found""",
+                "next_page_url": next_page_url,
+                "n": n,
+                "data": data,
+            }
         return res
 
 
@@ -476,6 +809,9 @@ def get_policy(
     pagesize: int = 100,
     count_only: bool = False,
     merge_like_policies: bool = True,
+    cursor: str = None,
+    next_page_path: str = "/get/policy",
+    last_update: datetime = None,
 ):
     """Returns Policy instance data that match the provided filters.
 
@@ -494,6 +830,16 @@ def get_policy(
         If true, returns the PonyORM database query object containing the
         filtered policies, otherwise returns the list of dictionaries
         containing the policy data as part of a response dictionary
+    cursor : str
+        Keyset pagination cursor returned in the `next_page_url` of the
+        previous page, if any. If provided, it is used instead of `page`.
+    next_page_path : str
+        Path of the route the `next_page_url` points to, i.e., the route
+        that was requested.
+    last_update : datetime
+        The time the data were last ingested, from `get_last_update`, which
+        makes cached responses expire when new data are ingested. It is not
+        otherwise used.
 
     Returns
     -------
@@ -512,6 +858,13 @@ def get_policy(
     )
     if use_pagination and (page is None or page == 0):
         page = 1
+
+    # use keyset pagination instead of page numbers if a cursor was provided,
+    # or for the first page if the ordering allows it, so that later pages
+    # are requested with the cursor in the next page URL
+    use_keyset: bool = use_pagination and (
+        cursor is not None or (page == 1 and is_keyset_ordering(db.Policy, ordering))
+    )
     q = select(i for i in db.Policy)
 
     # # define level filters based on geographic filters provided, if any
@@ -534,56 +887,31 @@ def get_policy(
 
     else:
 
-        if not random:
-            # apply ordering
-            ordering.reverse()
-            for field_tmp, direction in ordering:
-
-                # if ordering by place field, handle specially
-                if "auth_entity.place." in field_tmp:
-                    field = field_tmp.split(".")[-1]
-                    # sort policies by auth_entity place attribute using
-                    # largest or smallest value of the attribute among
-                    # policy's places
-                    if direction == "desc":
-                        q = select(
-                            (i, max(getattr(ae.place, field)))
-                            for i in q
-                            for ae in i.auth_entity
-                        ).order_by(desc(2))
-                    else:
-                        q = select(
-                            (i, min(getattr(ae.place, field)))
-                            for i in q
-                            for ae in i.auth_entity
-                        ).order_by(2)
-                elif "place." in field_tmp:
-                    field = field_tmp.split(".")[1]
-                    # sort policies by place attribute using largest or
-                    # smallest value of the attribute among policy's places
-                    if direction == "desc":
-                        q = select(
-                            (i, max(getattr(pl, field))) for i in q for pl in i.place
-                        ).order_by(desc(2))
-                    else:
-                        q = select(
-                            (i, min(getattr(pl, field))) for i in q for pl in i.place
-                        ).order_by(2)
-                else:
-                    field = field_tmp
-                    if direction == "desc":
-                        q = q.order_by(raw_sql(f"""i.{field} DESC NULLS LAST"""))
-                    else:
-                        q = q.order_by(raw_sql(f"""i.{field} NULLS LAST"""))
+        keyset_field: str = None
+        if use_keyset:
+            # apply ordering and cursor for keyset pagination
+            keyset_field, _ = get_keyset_ordering(db.Policy, ordering)
+            q = apply_keyset_pagination(q, db.Policy, ordering, cursor)
+        elif not random:
+            # apply ordering, the same as for keyset pagination if possible
+            # so that pages fetched either way are consistent
+            q = apply_ordering(
+                q, db.Policy, ordering, get_ordering_sql=get_policy_ordering_sql
+            )
         else:
             q = q.random(pagesize)
 
-        # get len of query
-        n = count(q) if (use_pagination and not random) else None
-
-        # apply pagination if using
-        if use_pagination and not random:
-            q = q.page(page, pagesize=pagesize)
+        # apply pagination if using, getting the len of the query only if it
+        # cannot be determined from the page; keyset pagination fetches one
+        # extra record to determine whether there are more pages instead
+        n = None
+        more_pages: bool = False
+        if use_keyset:
+            q = q.limit(pagesize + 1)
+        elif use_pagination and not random:
+            q, n, more_pages = get_page(
+                q, page, pagesize, get_count=lambda: get_policy_count(filters)
+            )
 
         # return query object if arguments requested it
         if return_db_instances:
@@ -591,109 +919,137 @@ def get_policy(
 
         # otherwise prepare list of dictionaries to return
         else:
-            return_fields_by_entity = defaultdict(list)
-
-            if fields is not None:
-                return_fields_by_entity["policy"] = [f for f in fields if "." not in f]
-
-            # get any linked entity fields and parse them
-            for f in fields:
-                if "." in f:
-                    f_arr = f.split(".")
-                    ent = None
-                    if len(f_arr) == 2:
-                        ent, field_name = f_arr
-                        return_fields_by_entity[ent].append(field_name)
-                    elif len(f_arr) == 3:
-                        ent, linked_ent, field_name = f_arr
-                        return_fields_by_entity[ent].append(linked_ent)
-                        return_fields_by_entity[linked_ent].append(field_name)
-                    return_fields_by_entity["policy"].append(ent)
-
-            for ent in return_fields_by_entity:
-                return_fields_by_entity[ent] = list(set(return_fields_by_entity[ent]))
-
-            # TODO dynamically set fields returned for Place and other
-            # linked entities
-            if "place" not in return_fields_by_entity:
-                return_fields_by_entity["place"] = [
-                    "id",
-                    "level",
-                    "loc",
-                    "home_rule",
-                    "dillons_rule",
-                    "area1",
-                    "area2",
-                    "iso3",
-                ]
-            if "auth_entity" not in return_fields_by_entity:
-                return_fields_by_entity["auth_entity"] = [
-                    "id",
-                    "place",
-                    "office",
-                    "name",
-                    "official",
-                    "area1",
-                    "area2",
-                    "iso3",
-                ]
-            # if 'court_challenges' not in return_fields_by_entity:
-            #     return_fields_by_entity['court_challenges'] = [
-            #         'id',
-            #     ]
+            # get fields to return for policies and their linked entities
+            return_fields_by_entity: dict = get_policy_return_fields_by_entity(
+                fields=None if fields is None else tuple(sorted(fields))
+            )
 
-            # format response to consist of tuples if it does not already
-            q_res: list = q[:][:]
-            if len(q_res) > 0 and type(q_res[0]) != tuple:
-                q_res = zip(q_res)
+            # fetch the policies, which the query returns as instances
+            instances: list = q[:]
 
-            # define list of instances to return
-            data = []
+            # if using keyset pagination, drop the extra record fetched
+            next_cursor: str = None
+            if use_keyset and len(instances) > pagesize:
+                instances = instances[:pagesize]
+                next_cursor = get_next_cursor(instances[-1], keyset_field)
 
-            # for each policy
-            for d, *_ in q_res:
-                # convert it to a dictionary returning only the
-                # specified fields
-                d_dict = d.to_dict_2(return_fields_by_entity=return_fields_by_entity)
-                # add it to the output list
-                data.append(d_dict)
+            # if using keyset pagination for the first page, get the len of
+            # the query as when using page numbers
+            if use_keyset and cursor is None:
+                n = len(instances) if next_cursor is None else get_policy_count(filters)
 
-            # if pagination is being used, get next page URL if there is one
-            n_pages = None if not use_pagination else math.ceil(n / pagesize)
-            more_pages = use_pagination and page < n_pages
-            next_page_url = (
-                None
-                if not more_pages
-                else f"""/get/policy?page={str(page + 1)}"""
-                f"""&pagesize={str(pagesize)}"""
+            # convert policies to dictionaries returning only the specified
+            # fields, loading their linked entities in bulk
+            data = db.Policy.to_dicts_2(
+                instances, return_fields_by_entity=return_fields_by_entity
             )
 
+            # if pagination is being used, get next page URL if there is one
+            if use_keyset:
+                next_page_url = (
+                    None
+                    if next_cursor is None
+                    else f"""{next_page_path}?cursor={next_cursor}"""
+                    f"""&pagesize={str(pagesize)}"""
+                )
+            else:
+                next_page_url = (
+                    None
+                    if not more_pages
+                    else f"""{next_page_path}?page={str(page + 1)}"""
+                    f"""&pagesize={str(pagesize)}"""
+                )
+
             # if by category: transform data to organize by category
             # NOTE: assumes one `primary_ph_measure` per Policy
             if by_category is not None:
                 data_by_category = defaultdict(list)
                 for i in data:
-                    data_by_category[i[by_category]].append(i)
-
-                res = PolicyDict(
-                    data=data_by_category,
-                    success=True,
-                    message=f"""{len(q)} policies found""",
-                    next_page_url=next_page_url,
-                    n=n,
-                )
+                    data_by_category[i[by_category]].append(
+                        helpers.get_model_dict(i, Policy)
+                    )
+
+                res = {
+                    "success": True,
+                    "message": f"""{len(instances)} policies found""",
+                    "next_page_url": next_page_url,
+                    "n": n,
+                    "data": data_by_category,
+                }
             else:
                 # create response from output list
-                res = PolicyList(
-                    data=data,
-                    success=True,
-                    message=f"""{len(q)} policies found""",
-                    next_page_url=next_page_url,
-                    n=n,
-                )
+                res = {
+                    "success": True,
+                    "message": f"""{len(instances)} policies found""",
+                    "next_page_url": next_page_url,
+                    "n": n,
+                    "data": [helpers.get_model_dict(i, Policy) for i in data],
+                }
             return res
 
 
+def get_policy_ordering_sql(field: str, direction: str) -> str:
+    """Returns the raw SQL ORDER BY term ordering policies by a field of their
+    places or of the places of their authorizing entities, using the largest
+    or smallest value of the field among them.
+
+    Args:
+        field (str): The field, e.g., "place.loc" or "auth_entity.place.loc"
+
+        direction (str): The direction, "asc" or "desc"
+
+    Returns:
+        str: The ORDER BY term, or None if the field is native to Policy.
+    """
+    if "auth_entity.place." in field:
+        return get_place_ordering_sql(
+            db.Policy, field.split(".")[-1], direction, via_auth_entity=True
+        )
+    elif "place." in field:
+        return get_place_ordering_sql(db.Policy, field.split(".")[1], direction)
+    else:
+        return None
+
+
+def get_policy_count(filters: dict = None) -> int:
+    """Returns the number of policies that match the provided filters,
+    reusing it for the same filters until new data are ingested, so that
+    later pages do not count the policies again.
+
+    Args:
+        filters (dict, optional): Dictionary of filters to be applied to
+        policy data (see function `apply_entity_filters`). Defaults to None.
+
+    Returns:
+        int: The number of policies.
+    """
+    return get_policy_count_for_version(
+        filters=filters, last_update=db.Version.get_last_update()
+    )
+
+
+@cached
+@db_session
+def get_policy_count_for_version(filters: dict, last_update: datetime) -> int:
+    """Returns the number of policies that match the provided filters, as of
+    the last update of the data.
+
+    Args:
+        filters (dict): Dictionary of filters to be applied to policy data
+        (see function `apply_entity_filters`).
+
+        last_update (datetime): The time the data were last ingested, which
+        makes cached counts expire when new data are ingested.
+
+    Returns:
+        int: The number of policies.
+    """
+    q = select(i for i in db.Policy)
+    if filters is not None:
+        q = apply_entity_filters(q, db.Policy, filters)
+    return q.count()
+
+
 @db_session
 @cached
 def get_challenge(
@@ -750,14 +1106,9 @@ def get_challenge(
     for field_tmp, direction in ordering:
         if "place." in field_tmp:
             field = field_tmp.split(".")[1]
-            if direction == "desc":
-                q = q.order_by(
-                    lambda i: desc(group_concat(getattr(p, field) for p in i.place))
-                )
-            else:
-                q = q.order_by(
-                    lambda i: group_concat(getattr(p, field) for p in i.place)
-                )
+            q = q.order_by(
+                raw_sql(get_place_ordering_sql(db.Court_Challenge, field, direction))
+            )
         else:
             field = field_tmp
             if direction == "desc":
@@ -765,12 +1116,12 @@ def get_challenge(
             else:
                 q = q.order_by(raw_sql(f"""i.{field} NULLS LAST"""))
 
-    # get len of query
-    n = count(q) if use_pagination else None
-
-    # apply pagination if using
+    # apply pagination if using, getting the len of the query only if it
+    # cannot be determined from the page
+    n = None
+    more_pages: bool = False
     if use_pagination:
-        q = q.page(page, pagesize=pagesize)
+        q, n, more_pages = get_page(q, page, pagesize)
 
     # return query object if arguments requested it
     if return_db_instances:
@@ -801,8 +1152,6 @@ def get_challenge(
             data.append(d_dict)
 
         # if pagination is being used, get next page URL if there is one
-        n_pages = None if not use_pagination else math.ceil(n / pagesize)
-        more_pages = use_pagination and page < n_pages
         next_page_url = (
             None
             if not more_pages
@@ -827,13 +1176,13 @@ def get_challenge(
             # )
         else:
             # create response from output list
-            res = ChallengeList(
-                data=data,
-                success=True,
-                message=f"""{n} challenge(s) found""",
-                next_page_url=next_page_url,
-                n=n,
-            )
+            res = {
+                "success": True,
+                "message": f"""{n} challenge(s) found""",
+                "next_page_url": next_page_url,
+                "n": n,
+                "data": [helpers.get_model_dict(i, Court_Challenge) for i in data],
+            }
         return res
 
 
@@ -847,21 +1196,23 @@ def get_place(
     include_policy_count=False,
 ):
     """Returns Place instance data that match the provided filters."""
-    places = select(
+    q = select(
         i
         for i in db.Place
         if (iso3 == "" or i.iso3.lower() == iso3)
         and (levels == None or i.level.lower() in levels)  # noqa: E711
         and (ansi_fips == "" or i.ansi_fips == ansi_fips)
-    )[:][:]
+    )
+    places = q[:][:]
 
     data = None
     if include_policy_count:
-        data_tmp = [(d.to_dict(only=fields), len(d.policies)) for d in places]
-        data = list()
-        for d, n_policies in data_tmp:
-            d.update({"n_policies": n_policies})
-            data.append(d)
+        # count policies of all matching places in one aggregate query
+        n_policies_by_id: dict = dict(select((i.id, count(i.policies)) for i in q))
+        data = [
+            {**d.to_dict(only=fields), "n_policies": n_policies_by_id.get(d.id, 0)}
+            for d in places
+        ]
     else:
         data = [d.to_dict(only=fields) for d in places]
 
@@ -938,12 +1289,12 @@ def get_plan(
             else:
                 q = q.order_by(getattr(db.Plan, field))
 
-    # get len of query
-    n = count(q) if use_pagination else None
-
-    # apply pagination if using
+    # apply pagination if using, getting the len of the query only if it
+    # cannot be determined from the page
+    n = None
+    more_pages: bool = False
     if use_pagination:
-        q = q.page(page, pagesize=pagesize)
+        q, n, more_pages = get_page(q, page, pagesize)
 
     # return query object if arguments requested it
     if return_db_instances:
@@ -961,21 +1312,11 @@ def get_plan(
         return_fields_by_entity["place"] = ["id", "level", "loc"]
         return_fields_by_entity["auth_entity"] = ["id", "name"]
 
-        # define list of instances to return
-        data = []
-
-        # for each policy
-        for d in q:
-
-            # convert it to a dictionary returning only the specified fields
-            d_dict = d.to_dict_2(return_fields_by_entity=return_fields_by_entity)
-
-            # add it to the output list
-            data.append(d_dict)
+        # convert plans to dictionaries returning only the specified fields,
+        # loading their linked entities in bulk
+        data = db.Plan.to_dicts_2(q[:], return_fields_by_entity=return_fields_by_entity)
 
         # if pagination is being used, get next page URL if there is one
-        n_pages = None if not use_pagination else math.ceil(n / pagesize)
-        more_pages = use_pagination and page < n_pages
         next_page_url = (
             None
             if not more_pages
@@ -998,13 +1339,13 @@ def get_plan(
             # )
         else:
             # create response from output list
-            res = PlanList(
-                data=data,
-                success=True,
-                message=f"""{len(q)} plans found""",
-                next_page_url=next_page_url,
-                n=n,
-            )
+            res = {
+                "success": True,
+                "message": f"""{len(data)} plans found""",
+                "next_page_url": next_page_url,
+                "n": n,
+                "data": [helpers.get_model_dict(i, Plan) for i in data],
+            }
         return res
 
 
@@ -1021,10 +1362,11 @@ def get_policy_status(
     # DEBUG filter by USA only
     filters["iso3"] = ["USA"] if geo_res == "state" else []
 
-    # get ordered policies from database
-    level = "State / Province"
+    # get ordered policies from database; `level` is only used by the
+    # commented-out query below
+    level = "State / Province"  # noqa: F841
     if geo_res == "country":
-        level = "Country"
+        level = "Country"  # noqa: F841
 
     q = select(i for i in db.Policy)
     # q = select(i for i in db.Policy if i.place.level == level)
@@ -1045,17 +1387,17 @@ def get_policy_status(
         end = None
         if "dates_in_effect" in filters:
             start, end = filters["dates_in_effect"]
-            start = datetime.strptime(start, "%Y-%m-%d").date()
-            end = datetime.strptime(end, "%Y-%m-%d").date()
+            start = str_to_date(start)
+            end = str_to_date(end)
 
         # If a date range is provided and the dates aren't the same, return
         # a not implemented message
         if start is not None and end is not None and start != end:
-            return PolicyStatusList(
-                data=list(),
-                success=False,
-                message="Start and end dates must be identical.",
-            )
+            return {
+                "success": False,
+                "message": "Start and end dates must be identical.",
+                "data": list(),
+            }
         else:
             # if date is not provided, return it in the response
             specify_date = start is None and end is None
@@ -1065,47 +1407,51 @@ def get_policy_status(
 
             # RETURN MOST RECENT OBSERVATION FOR EACH PLACE
             if name is None:
-                q = db.Observation.select_by_sql(
-                    f"""
-                            select distinct on (place) *
+                # get the place names and observation of each place at the
+                # level as tuples, joining places in the same query
+                q = db.select(
+                    """
+                            select distinct on (o.place) p.area1, p.iso3, o.value,
+                            o.date
                             from observation o
-                            where date <= '{str(start)}'
-                            order by place, date desc
+                            join place p on p.id = o.place
+                            where o.date <= $start
+                            and p.level = $level
+                            order by o.place, o.date desc
                     """
                 )
                 data = [
                     {
-                        "place_name": i.place.area1
-                        if geo_res == "state"
-                        else i.place.iso3,
-                        "value": i.value,
-                        "datestamp": i.date,
+                        "place_name": area1 if geo_res == "state" else iso3,
+                        "value": value,
+                        "datestamp": datestamp,
                     }
-                    for i in q
-                    if i.place.level == level
+                    for area1, iso3, value, datestamp in q
                 ]
             else:
 
-                # get all observations for the current date and convert them
-                # into policy statuses
-                observations = select(
-                    i
-                    for i in db.Observation
-                    if i.metric == 0 and (start is None or i.date == start)
-                ).order_by(db.Observation.date)
-
-                if name is not None:
-                    observations = observations.filter(lambda x: x.place.area1 == name)
+                # get the value and date of all observations of the named
+                # place for the current date as tuples, joining places in the
+                # same query, and convert them into policy statuses
+                observations = (
+                    select(
+                        (i.value, i.date)
+                        for i in db.Observation
+                        if i.metric == 0
+                        and (start is None or i.date == start)
+                        and i.place.area1 == name
+                    )
+                    .without_distinct()
+                    .order_by(2)
+                )
 
-                for d in observations:
+                for value, datestamp in observations:
                     datum = {
-                        "value": d.value,
+                        "value": value,
                     }
                     if specify_date:
-                        datum["datestamp"] = d.date
-                    if name is None:
-                        datum["place_name"] = d.place.area1
-                    data.append(PolicyStatus(**datum))
+                        datum["datestamp"] = datestamp
+                    data.append(datum)
     else:
 
         # Case B: Any other category
@@ -1115,27 +1461,17 @@ def get_policy_status(
 
         loc_field: str = GeoRes(geo_res).get_loc_field()
 
-        level: str = None
-        if geo_res == "country":
-            level = "Country"
-        elif geo_res == "state":
-            level = "State / Province"
-
-        q_loc = select(getattr(i.place, loc_field) for i in q)
-
-        data_tmp = dict()
-        for i in q_loc:
-            if i not in data_tmp:
-                data_tmp[i] = PolicyStatus(place_name=i, value="t")
-        data = list(data_tmp.values())
+        # get each distinct place name in the database, not in Python
+        q_loc = select(getattr(i.place, loc_field) for i in q).distinct()
+        data = [{"place_name": i, "value": "t"} for i in q_loc]
 
     # create response from output list
-    res = PolicyStatusList(
-        data=data,
-        success=True,
-        message=f"""Found {str(len(data))} status(es)"""
+    res = {
+        "success": True,
+        "message": f"""Found {str(len(data))} status(es)"""
         f"""{'' if name is None else ' for ' + name}""",
-    )
+        "data": data,
+    }
     return res
 
 
@@ -1157,93 +1493,106 @@ def get_lockdown_level(
     # RETURN MOST RECENT OBSERVATION FOR EACH PLACE
     # if iso3 provided, convert to where clause
     iso3_where_clause: str = ""
+    iso3_place_id: int = None
     if iso3 is not None and geo_res == "country":
         iso3_p: Place = select(
             p for p in db.Place if p.level == "Country" and p.iso3 == iso3
         ).get()
         if iso3_p is not None:
-            iso3_where_clause = f"""and place = {iso3_p.id}"""
+            # bound by `db.select` as `$iso3_place_id`
+            iso3_place_id = iso3_p.id  # noqa: F841
+            iso3_where_clause = "and o.place = $iso3_place_id"
 
+    # get the place fields and observation of each place at the requested
+    # level as tuples, joining places in the same query (`level` and
+    # `max_date` are bound by `db.select` as parameters)
+    country_only = geo_res == "country"
+    level: str = "Country" if country_only else "State / Province"  # noqa: F841
+    max_date: str = date if end_date is None else end_date  # noqa: F841
     distinct_clause = (
-        "distinct on (place)" if end_date is None else "distinct on (place, date)"
+        "distinct on (o.place)" if end_date is None else "distinct on (o.place, o.date)"
     )
-    q = db.Observation.select_by_sql(
-        f"""
-                select {distinct_clause} *
+    if not deltas_only:
+        q = db.select(
+            f"""
+                select {distinct_clause} p.iso3, p.area1, o.value, o.date
                 from observation o
-                where date <= '{date if end_date is None else end_date}'
+                join place p on p.id = o.place
+                where o.date <= $max_date
+                and p.level = $level
                 {iso3_where_clause}
-                order by place, date desc
-        """
-    )
+                order by o.place, o.date desc
+            """
+        )
+    else:
+        # if only the deltas are needed, get only the observation of each
+        # place on the date each different distancing level was entered,
+        # i.e., whose value differs from the place's previous observation
+        q = db.select(
+            f"""
+                select p.iso3, p.area1, d.value, d.date
+                from (
+                    select o.place, o.value, o.date,
+                    lag(o.value) over (
+                        partition by o.place order by o.date
+                    ) as prev_value
+                    from (
+                        select {distinct_clause} o.place, o.value, o.date
+                        from observation o
+                        where o.date <= $max_date
+                        {iso3_where_clause}
+                        order by o.place, o.date desc
+                    ) o
+                ) d
+                join place p on p.id = d.place
+                where p.level = $level
+                and d.value is distinct from d.prev_value
+                order by d.place, d.date desc
+            """
+        )
 
-    country_only = geo_res == "country"
-    for i in q:
-        if country_only and i.place.level != "Country":
-            continue
-        elif not country_only and i.place.level != "State / Province":
-            continue
+    for place_iso3, place_area1, value, datestamp in q:
+        datum = {
+            "value": value,
+            "datestamp": datestamp,
+        }
+        if country_only:
+            if iso3 == "all":
+                datum["place_name"] = place_iso3
+            elif place_iso3 != iso3:
+                continue
+            # else:
+            #     datum['place_name'] = place_iso3
         else:
+            if name is None:
+                datum["place_name"] = place_area1
+            elif place_area1 != name:
+                continue
+        data.append(datum)
 
-            datum = {
-                "value": i.value,
-                "datestamp": i.date,
-            }
-            if country_only:
-                if iso3 == "all":
-                    datum["place_name"] = i.place.iso3
-                elif i.place.iso3 != iso3:
-                    continue
-                # else:
-                #     datum['place_name'] = i.place.iso3
-            else:
-                if name is None:
-                    datum["place_name"] = i.place.area1
-                elif i.place.area1 != name:
-                    continue
-            data.append(datum)
-
-    # if `end_date` is specified, keep adding data until it is reached
-    if end_date is not None and len(data) > 0:
+    # if `end_date` is specified, keep adding data until it is reached, unless
+    # only the deltas are needed, since they would not change
+    if end_date is not None and len(data) > 0 and not deltas_only:
 
         # enddate date instance
-        end_date_dt = datetime.strptime(end_date, "%Y-%m-%d").date()
+        end_date_dt = str_to_date(end_date)
 
         pull_final_value_forward = data[0]["datestamp"] < end_date_dt
         if pull_final_value_forward:
+            # add one datum for each day after the last one until the end
+            # date, inclusive, newest first
             last_datum = data[0]
-            prv_date = last_datum["datestamp"]
-            cur_date = prv_date + timedelta(days=1)
-            while prv_date < end_date_dt:
-                datum = {
-                    "value": last_datum["value"],
-                    "datestamp": str(cur_date),
-                }
-                if "place_name" in last_datum:
-                    datum["place_name"] = last_datum["place_name"]
-
-                data.insert(0, datum)
-                prv_date = cur_date
-                cur_date = cur_date + timedelta(days=1)
-
-    # if only the deltas are needed, return one datum representing the date
-    # each different distancing level was entered, instead of all dates
-    message_noun = "status(es)"
-    if deltas_only:
-
-        # create list to hold output
-        deltas_only_data = list()
-
-        # Get iter funcs; assumes sorted by desc. datestamp
-        by_level = itertools.groupby(data, key=lambda x: x["value"])
+            last_date = last_datum["datestamp"]
+            n_days: int = (end_date_dt - last_date).days
+            datum_fields = {
+                k: last_datum[k] for k in ("value", "place_name") if k in last_datum
+            }
+            data[:0] = [
+                {**datum_fields, "datestamp": str(last_date + timedelta(days=d))}
+                for d in range(n_days, 0, -1)
+            ]
 
-        # Create iterator to iterate over groups of dates that had a given
-        # continous distancing level and keep only the oldest date
-        for level, items in by_level:
-            items = list(items)
-            deltas_only_data.append(items[len(items) - 1])
-        data = deltas_only_data
-        message_noun = "status change(s)"
+    message_noun = "status(es)" if not deltas_only else "status change(s)"
 
     # create response from output list
     message_name = None
@@ -1261,6 +1610,140 @@ def get_lockdown_level(
     return res
 
 
+@cached
+def get_policy_return_fields_by_entity(fields: Tuple[str, ...] = None) -> dict:
+    """Returns the fields to return for policies and each of their linked
+    entities, given the requested fields.
+
+    Args:
+        fields (Tuple[str, ...], optional): The requested fields, with
+        linked entity fields prefixed by the entity name, e.g.,
+        `auth_entity.place.loc`. Defaults to None.
+
+    Returns:
+        dict: Lists of fields to return indexed by entity name.
+    """
+    return_fields_by_entity: DefaultDict[str, Set[str]] = defaultdict(set)
+
+    if fields is not None:
+        return_fields_by_entity["policy"] = {f for f in fields if "." not in f}
+
+    # get any linked entity fields and parse them
+    for f in fields or ():
+        if "." in f:
+            f_arr = f.split(".")
+            ent = None
+            if len(f_arr) == 2:
+                ent, field_name = f_arr
+                return_fields_by_entity[ent].add(field_name)
+            elif len(f_arr) == 3:
+                ent, linked_ent, field_name = f_arr
+                return_fields_by_entity[ent].add(linked_ent)
+                return_fields_by_entity[linked_ent].add(field_name)
+            return_fields_by_entity["policy"].add(ent)
+
+    res: dict = {ent: list(v) for ent, v in return_fields_by_entity.items()}
+
+    # TODO dynamically set fields returned for Place and other
+    # linked entities
+    if "place" not in res:
+        res["place"] = [
+            "id",
+            "level",
+            "loc",
+            "home_rule",
+            "dillons_rule",
+            "area1",
+            "area2",
+            "iso3",
+        ]
+    if "auth_entity" not in res:
+        res["auth_entity"] = [
+            "id",
+            "place",
+            "office",
+            "name",
+            "official",
+            "area1",
+            "area2",
+            "iso3",
+        ]
+    # if 'court_challenges' not in res:
+    #     res['court_challenges'] = [
+    #         'id',
+    #     ]
+    return res
+
+
+def get_place_ordering_sql(
+    entity_class: db.Entity, field: str, direction: str, via_auth_entity: bool = False
+) -> str:
+    """Returns raw SQL ordering instances by the largest (descending) or
+    smallest (ascending) value of a place field among each instance's places.
+
+    The value is computed by a subquery per instance, so the ordered query
+    still contains only instances of the entity and can be counted and
+    paginated, rather than grouping or concatenating joined place rows.
+
+    Args:
+        entity_class (db.Entity): The entity ordered, one of `Policy`,
+        `Policy_Number`, or `Court_Challenge`. Court challenges are ordered
+        by the places of the policies they challenge.
+
+        field (str): The Place field to order by.
+
+        direction (str): The direction, "asc" or "desc".
+
+        via_auth_entity (bool, optional): If True, the places are those of
+        the policy's authorizing entities instead of the policy's own places.
+        Only supported for policies. Defaults to False.
+
+    Raises:
+        HTTPException: If the field is not a Place field.
+
+    Returns:
+        str: The SQL for the ordering, with the instance aliased as `i`.
+    """
+    attr = db.Place._adict_.get(field)
+    if attr is None or attr.is_relation:
+        raise HTTPException(
+            status_code=400, detail="Cannot order by place field: " + field
+        )
+    agg: str = "MAX" if direction == "desc" else "MIN"
+    if entity_class == db.Policy and via_auth_entity:
+        joins: str = """
+            FROM auth_entity_to_policy ae2p
+            JOIN auth_entity ae ON ae.id = ae2p.auth_entity
+            JOIN place pl ON pl.id = ae.place
+            WHERE ae2p.policy = i.id
+        """
+    elif entity_class == db.Policy:
+        joins: str = """
+            FROM place_to_policy p2p
+            JOIN place pl ON pl.id = p2p.place
+            WHERE p2p.policy = i.id
+        """
+    elif entity_class == db.Policy_Number:
+        joins: str = """
+            FROM place_policy_number p2pn
+            JOIN place pl ON pl.id = p2pn.place
+            WHERE p2pn.policy_number = i.id
+        """
+    elif entity_class == db.Court_Challenge:
+        joins: str = """
+            FROM policies_to_court_challenges cc2p
+            JOIN place_to_policy p2p ON p2p.policy = cc2p.policy
+            JOIN place pl ON pl.id = p2p.place
+            WHERE cc2p.court_challenge = i.id
+        """
+    else:
+        raise NotImplementedError(
+            "Cannot order by place field for entity: " + entity_class.__name__
+        )
+    subquery: str = f"""SELECT {agg}(pl."{field}") {joins}"""
+    return f"""({subquery}) {"DESC" if direction == "desc" else "ASC"} NULLS LAST"""
+
+
 @db_session
 def apply_entity_filters(
     q: Query,
@@ -1309,26 +1792,60 @@ def apply_entity_filters(
         # custom text search with fuzzy matching
         if field == "text":
             if len(allowed_values) > 0 and allowed_values[0] is not None:
-                text = allowed_values[0].lower()
+                text = allowed_values[0].casefold()
                 thresh = 80
+
+                # match in the database using trigram similarity if possible,
+                # which can use the trigram indexes on `search_text`
+                if has_pg_extension(name="pg_trgm"):
+                    q = apply_trigram_text_filter(q, text, thresh)
+                    continue
+
                 new_q_ids = []
                 q_search_text_only = select((i.id, i.search_text) for i in q)
 
+                # return exact matches, and score the remaining search texts
+                # for partial matches all at once
+                unmatched_ids = []
+                unmatched_search_texts = []
                 for id, search_text in q_search_text_only:
                     if search_text is None:
                         continue
+                    elif text in search_text:
+                        new_q_ids.append(id)
                     else:
-                        # return exact match - if no exact match return
-                        # partial match
-                        exact_match = text in search_text
-                        if exact_match:
-                            new_q_ids.append(id)
-                        else:
-                            ratio = fuzz.partial_ratio(text, search_text)
-                            partial_match = ratio >= thresh
-                            if partial_match:
-                                new_q_ids.append(id)
-                q = select(i for i in entity_class if i.id in new_q_ids)
+                        unmatched_ids.append(id)
+                        unmatched_search_texts.append(search_text)
+                if len(unmatched_search_texts) > 0:
+                    # scores are floats, so match those that round to at
+                    # least the threshold, as the integer scores of
+                    # `fuzzywuzzy` did
+                    min_ratio: float = thresh - 0.5
+                    ratios = process.cdist(
+                        [text],
+                        unmatched_search_texts,
+                        scorer=fuzz.partial_ratio,
+                        processor=None,
+                        score_cutoff=min_ratio,
+                        workers=FUZZY_MATCH_WORKERS,
+                    )[0]
+                    new_q_ids += [
+                        id
+                        for id, ratio in zip(unmatched_ids, ratios)
+                        if ratio >= min_ratio
+                    ]
+
+                # match the IDs as one array parameter instead of a list of
+                # values, so the SQL is the same for any number of matches;
+                # bound by `raw_sql` as `$new_q_ids_array`
+                new_q_ids_array: str = (  # noqa: F841
+                    "{" + ",".join(map(str, new_q_ids)) + "}"
+                )
+                q = select(
+                    i
+                    for i in entity_class
+                    if raw_sql('"i"."id" = any(cast($new_q_ids_array as integer[]))')
+                )
 
                 # # Text match with direct case insensitive matches only
                 # q = select(
@@ -1343,74 +1860,75 @@ def apply_entity_filters(
         # because the field contains arrays instead of strings
         if field == "complaint_category":
 
-            for value in allowed_values:
-                q = select(i for i in q if value in i.complaint_category)
+            # match all values at once with the array contains operator, which
+            # can use the GIN index on `complaint_category`, binding them as
+            # one array literal parameter (bound by `raw_sql` below)
+            complaint_category_array: str = (  # noqa: F841
+                "{"
+                + ",".join(
+                    '"' + v.replace("\\", "\\\\").replace('"', '\\"') + '"'
+                    for v in allowed_values
+                )
+                + "}"
+            )
+            q = q.filter(
+                lambda i: raw_sql(
+                    '"i"."complaint_category"'
+                    " @> cast($complaint_category_array as text[])"
+                )
+            )
 
             continue
 
+        # values matched with `in` below, padded so Pony can reuse translated
+        # queries for value lists of similar length
+        in_values: list = pad_in_values(allowed_values)
+
         if field == "government_order_upheld_or_enjoined":
             if "Pending" in allowed_values:
-                q = select(
-                    i
-                    for i in q
-                    if getattr(i, field) in allowed_values or getattr(i, field) == ""
+                q = q.filter(
+                    lambda i: getattr(i, field) in in_values or getattr(i, field) == ""
                 )
 
             else:
-                q = select(i for i in q if getattr(i, field) in allowed_values)
+                q = q.filter(lambda i: getattr(i, field) in in_values)
 
             continue
 
         # if it is a date field, handle it specially
         if field.startswith("date"):
 
-            # set allowed values to be start and end date instances
-            # allowed_values = list(map(str_to_date, allowed_values))
+            # allowed values are already start and end date instances, parsed
+            # by the filter model, so they are not converted again here
 
             # Way using db.Policy_Date (new)
             # if it's the special "dates_in_effect" filter, handle it
             # and continue
-            date_fields: Set[str] = {
-                "date_start_effective",
-                "date_end_anticipated",
-                "date_end_actual",
-                "date_issued",
-                "date_of_decision",
-                "date_of_complaint",
-            }
             if field == "dates_in_effect":
-                win_left: str = allowed_values[0]
-                win_right: str = allowed_values[1]
+                win_left: date = allowed_values[0]
+                win_right: date = allowed_values[1]
 
-                q = select(
-                    i
-                    for i in q
-                    for pd in db.Policy_Date
-                    if i.id == pd.fk_policy_id
-                    and (
-                        # left is during window (inclusive)
-                        (pd.start_date <= win_left and win_left <= pd.end_date)
-                        or
-                        # right is during window (inclusive)
-                        (pd.start_date <= win_right and win_right <= pd.end_date)
-                        or
-                        # left is before start AND right is after or
-                        # during start
-                        (win_left < pd.start_date and pd.start_date <= win_right)
+                # policy dates overlap the window (inclusive) if they start
+                # before its end and end after its start
+                q = q.filter(
+                    lambda i: exists(
+                        pd
+                        for pd in db.Policy_Date
+                        if i.id == pd.fk_policy_id
+                        and pd.start_date <= win_right
+                        and win_left <= pd.end_date
                     )
                 )
                 continue
 
-            elif field in date_fields:
+            elif field in DATE_FIELDS:
                 # return instances where `date_of_decision` falls within the
                 # specified range, inclusive
                 win_left = allowed_values[0]
                 win_right = allowed_values[1]
 
-                q = select(
-                    i
-                    for i in q
-                    if getattr(i, field) is not None
+                q = q.filter(
+                    lambda i: getattr(i, field) is not None
                     and getattr(i, field) <= win_right
                     and getattr(i, field) >= win_left
                 )
@@ -1419,15 +1937,7 @@ def apply_entity_filters(
         # is the filter applied by joining a policy instance to a
         # different entity?
         # TODO generalize this and rename function `apply_entity_filters`
-        join_place = field in (
-            "level",
-            "loc",
-            "area1",
-            "iso3",
-            "country_name",
-            "area2",
-            "ansi_fips",
-        )
+        join_place = field in PLACE_JOIN_FIELDS
 
         # filter applies to auth_entity place?
         join_auth_entity_place: bool = "auth_entity.place." in field
@@ -1472,7 +1982,7 @@ def apply_entity_filters(
                     lambda i: exists(
                         t
                         for t in i.auth_entity
-                        if getattr(t.place, place_field) in allowed_values
+                        if getattr(t.place, place_field) in in_values
                         and (
                             allow_hybrid_levels
                             or t.place.level != "Local plus state/province"
@@ -1499,7 +2009,7 @@ def apply_entity_filters(
                     lambda i: exists(
                         t
                         for t in i.place
-                        if getattr(t, field) in allowed_values
+                        if getattr(t, field) in in_values
                         and (
                             allow_hybrid_levels
                             or t.level != "Local plus state/province"
@@ -1543,16 +2053,14 @@ def apply_entity_filters(
         # joined to policy entity: policy number field
         elif join_policy_number:
             q = q.filter(
-                lambda i: exists(
-                    t for t in i.policies if t.policy_number in allowed_values
-                )
+                lambda i: exists(t for t in i.policies if t.policy_number in in_values)
             )
 
         # joined to policy entity: any other non-set field
         elif join_policy_nonset_field:
             q = q.filter(
                 lambda i: exists(
-                    t for t in i.policies if getattr(t, field) in allowed_values
+                    t for t in i.policies if getattr(t, field) in in_values
                 )
             )
 
@@ -1567,7 +2075,7 @@ def apply_entity_filters(
             )
         else:
             # if the filter is not a join, i.e., is on policy native fields
-            q = select(i for i in q if getattr(i, field) in allowed_values)
+            q = q.filter(lambda i: getattr(i, field) in in_values)
 
     # # if a level of "Local plus state/province" was not provided in the
     # # filters, do not return any places with that level.
@@ -1587,6 +2095,60 @@ def apply_entity_filters(
 
 
 @db_session
+@cached
+def has_pg_extension(name: str) -> bool:
+    """Returns True if the Postgres extension is installed in the database,
+    False otherwise.
+
+    Args:
+        name (str): The name of the extension, e.g., `pg_trgm`.
+
+    Returns:
+        bool: True if the extension is installed in the database.
+    """
+    return len(db.select("SELECT 1 FROM pg_extension WHERE extname = $name")) > 0
+
+
+def apply_trigram_text_filter(q: Query, text: str, thresh: int = 80) -> Query:
+    """Filters the query to instances whose search text contains the text or
+    matches it approximately, using the `pg_trgm` extension.
+
+    This mirrors the exact match or `fuzz.partial_ratio` matching done in
+    Python when `pg_trgm` is not installed, with approximate matches defined
+    by the word similarity of the text to the closest part of the search text.
+    The `<%` operator selects candidates using the trigram indexes on
+    `search_text` (see `ingest/sql/create_tables/create_index_search_text_pg.sql`)
+    before word similarity is compared to the threshold.
+
+    Args:
+        q (Query): The query to be filtered.
+
+        text (str): The case-folded text to search for.
+
+        thresh (int, optional): The minimum similarity, from 0 to 100, of
+        approximate matches. Defaults to 80.
+
+    Returns:
+        Query: The filtered query.
+    """
+    # bound by `raw_sql` below as `$text_like` and `$min_similarity`
+    text_like: str = (  # noqa: F841
+        "%" + text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+    )
+    min_similarity: float = thresh / 100  # noqa: F841
+    return q.filter(
+        lambda i: raw_sql(
+            """
+            "i"."search_text" LIKE $text_like
+            OR (
+                $text <% "i"."search_text"
+                AND word_similarity($text, "i"."search_text") >= $min_similarity
+            )
+            """
+        )
+    )
+
+
 def get_policy_search_text(i):
     """Given Policy instance `i`, returns the search text string that should
     be checked against by plain text search.
@@ -1779,8 +2341,29 @@ def get_search_text(i, fields_by_type, linked_fields_by_type):
         Description of returned object.
 
     """
+    # return joined text string
+    search_text = " - ".join(
+        iter_search_text_values(i, fields_by_type, linked_fields_by_type)
+    )
+    return search_text
+
+
+def iter_search_text_values(i, fields_by_type, linked_fields_by_type):
+    """Yields the case-folded values of the instance's fields and linked
+    entities' fields that make up its search text, in order.
+
+    Args:
+        i (db.Entity): The instance.
+
+        fields_by_type (list): The fields of the instance, grouped by type.
+
+        linked_fields_by_type (list): The fields of linked entities, grouped
+        by the field linking them and their type.
+
+    Yields:
+        Iterator[str]: The values, case-folded.
+    """
     # for each field on the entity class, concatenate it to the search text
-    search_text_list = list()
     for field_group in fields_by_type:
         field_type = field_group["type"]
         # string type fields are concatenated directly
@@ -1788,14 +2371,14 @@ def get_search_text(i, fields_by_type, linked_fields_by_type):
             for field in field_group["fields"]:
                 value = getattr(i, field)
                 if value is not None:
-                    search_text_list.append(value.lower())
+                    yield value.casefold()
 
         # list type fields - each element concatenated
         elif field_type == list:
             for field in field_group["fields"]:
                 for d in getattr(i, field):
                     if d is not None:
-                        search_text_list.append(d.lower())
+                        yield d.casefold()
 
     # for each linked entity field, do the same
     for field_group in linked_fields_by_type:
@@ -1812,22 +2395,23 @@ def get_search_text(i, fields_by_type, linked_fields_by_type):
                         for field in field_group["fields"]:
                             value = getattr(linked_instance, field)
                             if value is not None:
-                                search_text_list.append(value.lower())
-
-    # return joined text string
-    search_text = " - ".join(search_text_list)
-    return search_text
+                                yield value.casefold()
 
 
 @db_session
 def add_search_text():
-    """Add searchable text strings to instances."""
-    for i in db.Policy.select():
-        i.search_text = get_policy_search_text(i)
-    for i in db.Plan.select():
-        i.search_text = get_plan_search_text(i)
-    for i in db.Court_Challenge.select():
-        i.search_text = get_challenge_search_text(i)
+    """Add searchable text strings to instances, updating only instances
+    whose search text has changed."""
+    # load linked entities used in search text in bulk
+    for entity_class, linked_attr, get_search_text_func in (
+        (db.Policy, db.Policy.place, get_policy_search_text),
+        (db.Plan, db.Plan.place, get_plan_search_text),
+        (db.Court_Challenge, db.Court_Challenge.policies, get_challenge_search_text),
+    ):
+        for i in entity_class.select().prefetch(linked_attr):
+            search_text: str = get_search_text_func(i)
+            if i.search_text != search_text:
+                i.search_text = search_text
 
 
 def apply_subgeo_filter(q: Query, geo_res: GeoRes) -> Query:
@@ -1850,7 +2434,7 @@ def apply_subgeo_filter(q: Query, geo_res: GeoRes) -> Query:
     if geo_res == GeoRes.state:
         q = q.filter(
             lambda i: not exists(
-                t for t in i.place if t.level in ("State / Province", "Country")
+                t for t in i.place if t.level in STATE_OR_COUNTRY_LEVELS
             )
         )
     elif geo_res == GeoRes.country:
@@ -17,9 +17,26 @@ class ExcelExport:
     def __init__(self):
         return None
 
-    def build(self, **kwargs):
-        # Create bytes output to return to client
-        io = BytesIO()
+    def build(self, io: BytesIO = None, **kwargs):
+        """Builds the XLSX file.
+
+        Parameters
+        ----------
+        io : BytesIO
+            Optional bytes buffer to write the XLSX file to. If provided, the
+            buffer is returned at its start instead of a copy of its bytes,
+            so it can be streamed to the client without copying it.
+
+        Returns
+        -------
+        bytes **or** BytesIO
+            The XLSX file bytes, or `io` if it was provided.
+
+        """
+        # Create bytes output to return to client, if none was provided
+        return_bytes: bool = io is None
+        if return_bytes:
+            io = BytesIO()
         writer = pd.ExcelWriter(
             "temp.xlsx",
             engine="xlsxwriter",
@@ -39,6 +56,8 @@ class ExcelExport:
 
         # return to start of IO stream
         io.seek(0)
+        if not return_bytes:
+            return io
 
         # return export file
         content = io.read()
@@ -1,4 +1,7 @@
 from datetime import date
+from typing import Any, Type
+
+from pydantic import BaseModel
 
 
 def get_body_attr(body, attr_name, default=dict()) -> dict:
@@ -28,3 +31,35 @@ def get_static_excel_export_filename(is_summary: bool) -> str:
         f"COVID AMP - Full Data Export{' (summary)' if is_summary else ''}"
         f" {today_date}.xlsx"
     )
+
+
+def get_model_dict(d: dict, model: Type[BaseModel]) -> dict:
+    """Returns the dictionary with only the keys that are fields of the model,
+    recursively for fields whose values are models or lists of models, which
+    is how the dictionary would be returned by an endpoint with the model as
+    its response model and `response_model_exclude_unset=True`.
+
+    Args:
+        d (dict): The dictionary, e.g., an instance converted with `to_dict`.
+
+        model (Type[BaseModel]): The model.
+
+    Returns:
+        dict: The dictionary with only the keys that are fields of the model.
+    """
+    res: dict = dict()
+    for k, v in d.items():
+        field = model.__fields__.get(k)
+        if field is None:
+            continue
+        field_type: Any = field.type_
+        if isinstance(field_type, type) and issubclass(field_type, BaseModel):
+            if isinstance(v, dict):
+                v = get_model_dict(v, field_type)
+            elif isinstance(v, list):
+                v = [
+                    get_model_dict(x, field_type) if isinstance(x, dict) else x
+                    for x in v
+                ]
+        res[k] = v
+    return res
@@ -3,13 +3,13 @@
 from api.ampresolvers.optionsetgetter.core import OptionSetGetter
 from api.types import ClassName, GeoRes, GeoResCountryState
 from api.ampresolvers import PolicyStatusCounter
-from datetime import date
+from datetime import date, datetime
 from enum import Enum
 
 # 3rd party modules
-from fastapi import Query, Path, Response
+from fastapi import Query, Path, Request, Response
 from starlette.responses import RedirectResponse, FileResponse
-from typing import List
+from typing import List, Union
 
 # local modules
 from . import routing_additional  # noqa F401
@@ -35,6 +35,7 @@ from .models import (
     ExportFiltersNoOrdering,
     VersionResponse,
 )
+from .utils import DataJSONResponse
 from . import helpers
 from . import app
 from db import db  # noqa F401
@@ -100,6 +101,29 @@ EXCEL_EXPORT_FILTERS_DESCR = "".join(
 )
 
 
+def get_not_modified_response(request: Request, etag: str) -> Union[Response, None]:
+    """Returns an empty 304 response if the client already has the response
+    with the entity tag provided, as indicated by its `If-None-Match` header.
+
+    Args:
+        request (Request): The request.
+
+        etag (str): The entity tag of the response to the request.
+
+    Returns:
+        Union[Response, None]: The 304 response, or None if the client does
+        not have the response.
+    """
+    if_none_match: str = request.headers.get("if-none-match", "")
+    client_etags: List[str] = [
+        client_etag.strip().replace("W/", "", 1)
+        for client_etag in if_none_match.split(",")
+    ]
+    if etag in client_etags or "*" in client_etags:
+        return Response(status_code=304, headers={"etag": etag})
+    return None
+
+
 @app.post(
     "/export",
     tags=["Downloads"],
@@ -128,6 +152,7 @@ EXCEL_EXPORT_FILTERS_DESCR = "".join(
     include_in_schema=False,
 )
 async def post_export(
+    request: Request,
     body: ExportFiltersNoOrdering,
     class_name: ClassNameExport = Query(
         ClassNameExport.all_static,
@@ -156,6 +181,18 @@ async def post_export(
     if class_name == ClassNameExport.none or class_name is None:
         raise NotImplementedError("Must provide a `class_name` to /post/export")
     filters = body.filters.dict() if bool(body.filters) is True else None
+
+    # if the client already has the export for the current data, do not send
+    # it again (static exports are not versioned with the data)
+    if not class_name.name.startswith("all_static"):
+        etag: str = core.get_export_etag(
+            filters=filters,
+            class_name=class_name.name,
+            last_update=core.get_last_update(),
+        )
+        not_modified_response = get_not_modified_response(request, etag)
+        if not_modified_response is not None:
+            return not_modified_response
     return core.export(filters=filters, class_name=class_name.name)
 
 
@@ -276,6 +313,8 @@ async def get_count(
     include_in_schema=False,
 )
 async def get_metadata(
+    request: Request,
+    response: Response,
     entity_class_name: ClassName = Query(
         ClassName.Policy,
         description="The name of the data type for which metadata" " are requested",
@@ -295,6 +334,15 @@ async def get_metadata(
     )
     if entity_class_name is None:
         raise NotImplementedError("Must provide a `entity_class_name` to /get/metadata")
+    etag: str = core.get_etag(
+        request.url.path,
+        request.query_params.multi_items(),
+        last_update=core.get_last_update(),
+    )
+    not_modified_response = get_not_modified_response(request, etag)
+    if not_modified_response is not None:
+        return not_modified_response
+    response.headers["etag"] = etag
     return core.get_metadata(fields=fields, entity_class_name=entity_class_name.name)
 
 
@@ -339,7 +387,7 @@ async def get_file_title_required(
     ),
     title: str = Query("Filename", description="Any filename"),
 ):
-    return core.get_file(id)
+    return core.get_file(id, title)
 
 
 @app.get(
@@ -361,7 +409,7 @@ async def get_file(
     ),
     title: str = Query("Filename", description="Any filename"),
 ):
-    return core.get_file(id)
+    return core.get_file(id, title)
 
 
 @app.get(
@@ -372,14 +420,32 @@ async def get_file(
     include_in_schema=False,
 )
 async def get_policy(
+    request: Request,
     fields: List[str] = Query(None),
     page: int = None,
     pagesize: int = 100,
     count: bool = False,
+    cursor: str = None,
 ):
     """Return Policy data."""
-    return core.get_policy(
-        fields=fields, page=page, pagesize=pagesize, count_only=count
+    # build the entity tag and the response for the same version of the data
+    last_update: datetime = core.get_last_update()
+    etag: str = core.get_etag(
+        request.url.path, request.query_params.multi_items(), last_update=last_update
+    )
+    not_modified_response = get_not_modified_response(request, etag)
+    if not_modified_response is not None:
+        return not_modified_response
+    return DataJSONResponse(
+        core.get_policy(
+            fields=fields,
+            page=page,
+            pagesize=pagesize,
+            count_only=count,
+            cursor=cursor,
+            last_update=last_update,
+        ),
+        headers={"etag": etag},
     )
 
 
@@ -397,6 +463,7 @@ async def get_policy(
     include_in_schema=False,
 )
 async def post_policy(
+    request: Request,
     body: PolicyBody,
     fields: List[PolicyFields] = Query(
         [PolicyFields.id],
@@ -404,6 +471,14 @@ async def post_policy(
     ),
     page: int = Query(1, description="Page to return"),
     pagesize: int = Query(100, description="Number of records per page"),
+    cursor: str = Query(
+        None,
+        description="Cursor of the page to return, as provided in the"
+        " `next_page_url` of the previous page. If defined, `page` is ignored"
+        " and pages are fetched more efficiently, but `n` is not returned and"
+        " `ordering` may contain one Policy field at most. The first page"
+        " provides a cursor in its `next_page_url` if its `ordering` allows it.",
+    ),
     count: bool = Query(
         False,
         description="If true, return number of records only, otherwise return"
@@ -428,16 +503,21 @@ async def post_policy(
         for v in fields
         if v not in (PolicyFields.none, PolicyFields.court_challenges_id)
     ]
-    return core.get_policy(
-        filters=helpers.get_body_attr(body, "filters"),
-        fields=fields,
-        by_category=None,
-        page=page,
-        pagesize=pagesize,
-        ordering=body.ordering,
-        count_only=count,
-        random=random,
-        merge_like_policies=merge_like_policies,
+    return DataJSONResponse(
+        core.get_policy(
+            filters=helpers.get_body_attr(body, "filters"),
+            fields=fields,
+            by_category=None,
+            page=page,
+            pagesize=pagesize,
+            ordering=body.ordering,
+            count_only=count,
+            random=random,
+            merge_like_policies=merge_like_policies,
+            cursor=cursor,
+            next_page_path=request.url.path,
+            last_update=core.get_last_update(),
+        )
     )
 
 
@@ -564,7 +644,7 @@ async def get_plan(
         Plan response dictionary.
 
     """
-    return core.get_plan(fields=fields, page=page, pagesize=pagesize)
+    return DataJSONResponse(core.get_plan(fields=fields, page=page, pagesize=pagesize))
 
 
 @app.get(
@@ -595,7 +675,7 @@ async def get_policy_status(geo_res=str):
         Policy response dictionary.
 
     """
-    return core.get_policy_status(geo_res=geo_res)
+    return DataJSONResponse(core.get_policy_status(geo_res=geo_res))
 
 
 @app.get(
@@ -695,9 +775,11 @@ async def post_policy_status(
         description="The geographic resolution for which to return data",
     ),
 ):
-    return core.get_policy_status(
-        geo_res=geo_res,
-        filters=body.ordering,
+    return DataJSONResponse(
+        core.get_policy_status(
+            geo_res=geo_res,
+            filters=body.ordering,
+        )
     )
 
 
@@ -803,15 +885,19 @@ async def post_policy_number(
     fields: List[str] = Query(None),
     page: int = None,
     pagesize: int = 100,
+    cursor: str = None,
 ):
     """Return Policy number metadata."""
-    return core.get_policy_number(
-        filters=helpers.get_body_attr(body, "filters"),
-        fields=fields,
-        by_category=None,
-        page=page,
-        pagesize=pagesize,
-        ordering=body.ordering,
+    return DataJSONResponse(
+        core.get_policy_number(
+            filters=helpers.get_body_attr(body, "filters"),
+            fields=fields,
+            by_category=None,
+            page=page,
+            pagesize=pagesize,
+            ordering=body.ordering,
+            cursor=cursor,
+        )
     )
 
 
@@ -869,13 +955,15 @@ async def post_plan(
     pagesize: int = Query(100, description="Number of records per page"),
 ):
     fields = [v for v in fields if v != PlanFields.none]
-    return core.get_plan(
-        filters=helpers.get_body_attr(body, "filters"),
-        fields=fields,
-        by_category=None,
-        page=page,
-        pagesize=pagesize,
-        ordering=body.ordering,
+    return DataJSONResponse(
+        core.get_plan(
+            filters=helpers.get_body_attr(body, "filters"),
+            fields=fields,
+            by_category=None,
+            page=page,
+            pagesize=pagesize,
+            ordering=body.ordering,
+        )
     )
 
 
@@ -922,6 +1010,8 @@ iso3_def = Query(
     include_in_schema=False,
 )
 async def get_optionset(
+    request: Request,
+    response: Response,
     class_name: ClassName = Query(
         ClassName.Policy,
         description="The name of the data type for which optionsets " "are requested",
@@ -935,6 +1025,15 @@ async def get_optionset(
     state_name: StateNames = state_name_def,
     iso3: Iso3Codes = iso3_def,
 ):
+    etag: str = core.get_etag(
+        request.url.path,
+        request.query_params.multi_items(),
+        last_update=core.get_last_update(),
+    )
+    not_modified_response = get_not_modified_response(request, etag)
+    if not_modified_response is not None:
+        return not_modified_response
+    response.headers["etag"] = etag
     getter: OptionSetGetter = OptionSetGetter()
     return getter.get_optionset(
         fields=fields,
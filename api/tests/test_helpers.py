@@ -0,0 +1,30 @@
+from typing import List
+
+from pydantic import BaseModel
+
+from api.helpers import get_model_dict
+
+
+class Child(BaseModel):
+    id: int
+    name: str = None
+
+
+class Parent(BaseModel):
+    id: int
+    children: List[Child] = None
+    child: Child = None
+
+
+def test_get_model_dict():
+    d = {
+        "id": 1,
+        "search_text": "dropped",
+        "children": [{"id": 2, "name": "a", "extra": True}],
+        "child": {"id": 3, "extra": True},
+    }
+    assert get_model_dict(d, Parent) == {
+        "id": 1,
+        "children": [{"id": 2, "name": "a"}],
+        "child": {"id": 3},
+    }
@@ -0,0 +1,166 @@
+from datetime import date
+
+import pytest
+from fastapi import HTTPException
+from pony.orm import Database, Optional, PrimaryKey, db_session, select
+
+from api.utils import (
+    apply_keyset_pagination,
+    apply_ordering,
+    cached,
+    decode_cursor,
+    encode_cursor,
+    get_cache_key,
+    get_next_cursor,
+    get_page,
+    pad_in_values,
+    str_to_date,
+)
+
+test_db = Database()
+
+
+class Item(test_db.Entity):
+    id = PrimaryKey(int)
+    rank = Optional(int)
+
+
+test_db.bind("sqlite", ":memory:")
+test_db.generate_mapping(create_tables=True)
+with db_session:
+    for id, rank in enumerate([2, None, 1, 2, None, 1, 3], start=1):
+        Item(id=id, rank=rank)
+
+# IDs of the items in each ordering: missing ranks last, ties broken by ID
+ITEM_IDS_BY_ORDERING = {
+    (): [1, 2, 3, 4, 5, 6, 7],
+    (("rank", "asc"),): [3, 6, 1, 4, 7, 2, 5],
+    (("rank", "desc"),): [7, 1, 4, 3, 6, 2, 5],
+    (("id", "desc"),): [7, 6, 5, 4, 3, 2, 1],
+}
+
+
+def get_keyset_page(ordering, cursor, pagesize):
+    q = select(i for i in Item)
+    q = apply_keyset_pagination(q, Item, [list(o) for o in ordering], cursor)
+    items = q.limit(pagesize + 1)[:]
+    next_cursor = None
+    if len(items) > pagesize:
+        items = items[:pagesize]
+        next_cursor = get_next_cursor(items[-1], ordering[0][0] if ordering else "id")
+    return [i.id for i in items], next_cursor
+
+
+def get_offset_page(ordering, page, pagesize):
+    q = apply_ordering(select(i for i in Item), Item, [list(o) for o in ordering])
+    items, _, _ = get_page(q, page, pagesize)
+    return [i.id for i in items]
+
+
+def test_cursor_round_trip():
+    assert decode_cursor(encode_cursor("2020-03-01", 12)) == ("2020-03-01", 12)
+    assert decode_cursor(encode_cursor(date(2020, 3, 1), 12)) == ("2020-03-01", 12)
+    assert decode_cursor(encode_cursor(None, 7)) == (None, 7)
+
+
+def test_cursor_malformed():
+    with pytest.raises(ValueError):
+        decode_cursor("not a cursor")
+    with pytest.raises(ValueError):
+        decode_cursor(encode_cursor("2020-03-01", "12"))
+
+
+def test_cursor_field():
+    cursor = encode_cursor("2020-03-01", 12, "date_start_effective")
+    assert decode_cursor(cursor, field="date_start_effective") == ("2020-03-01", 12)
+    with pytest.raises(ValueError):
+        decode_cursor(cursor, field="id")
+    with pytest.raises(ValueError):
+        decode_cursor(encode_cursor(12, 12), field="id")
+
+
+@db_session
+def test_get_page():
+    q = select(i for i in Item).order_by(Item.id)
+
+    def get_count():
+        raise AssertionError("count not needed")
+
+    records, n, more_pages = get_page(q, 1, 3)
+    assert ([i.id for i in records], n, more_pages) == ([1, 2, 3], 7, True)
+    records, n, more_pages = get_page(q, 3, 3, get_count=get_count)
+    assert ([i.id for i in records], n, more_pages) == ([7], 7, False)
+    records, n, more_pages = get_page(q, 2, 5, get_count=get_count)
+    assert ([i.id for i in records], n, more_pages) == ([6, 7], 7, False)
+    assert get_page(q, 4, 3, get_count=lambda: 7) == ([], 7, False)
+    empty = select(i for i in Item if i.id > 7)
+    assert get_page(empty, 1, 3, get_count=get_count) == ([], 0, False)
+
+
+@db_session
+def test_apply_keyset_pagination():
+    for ordering, ids in ITEM_IDS_BY_ORDERING.items():
+        for pagesize in (1, 2, 3, 7):
+            pages = []
+            cursor = None
+            while True:
+                page_ids, cursor = get_keyset_page(ordering, cursor, pagesize)
+                pages.append(page_ids)
+                if cursor is None:
+                    break
+            assert [id for page_ids in pages for id in page_ids] == ids
+            assert all(len(page_ids) == pagesize for page_ids in pages[:-1])
+
+
+@db_session
+def test_apply_keyset_pagination_rejects_other_ordering():
+    _, cursor = get_keyset_page((("rank", "asc"),), None, 2)
+    with pytest.raises(HTTPException):
+        get_keyset_page((("id", "desc"),), cursor, 2)
+    with pytest.raises(HTTPException):
+        get_keyset_page((("rank", "asc"), ("id", "asc")), None, 2)
+
+
+@db_session
+def test_keyset_and_offset_pages_match():
+    for ordering, ids in ITEM_IDS_BY_ORDERING.items():
+        first_page, cursor = get_keyset_page(ordering, None, 3)
+        assert first_page == get_offset_page(ordering, 1, 3) == ids[:3]
+        assert get_offset_page(ordering, 2, 3) == ids[3:6]
+        assert get_keyset_page(ordering, cursor, 3)[0] == ids[3:6]
+
+
+def test_pad_in_values():
+    assert pad_in_values([]) == []
+    assert pad_in_values(["a"]) == ["a"]
+    assert pad_in_values([1, 2, 3]) == [1, 2, 3, 3]
+    assert len(pad_in_values(list(range(5)))) == 8
+
+
+def test_cache_key_ignores_dict_order():
+    a = {"filters": {"iso3": ["USA"], "level": ["State / Province"]}, "page": 1}
+    b = {"page": 1, "filters": {"level": ["State / Province"], "iso3": ["USA"]}}
+    assert get_cache_key(a) == get_cache_key(b)
+    assert get_cache_key(a) != get_cache_key({**a, "page": 2})
+
+
+def test_str_to_date():
+    assert str_to_date("2020-03-01") == date(2020, 3, 1)
+    assert str_to_date("2020-1-5") == date(2020, 1, 5)
+    with pytest.raises(ValueError):
+        str_to_date("03/01/2020")
+
+
+def test_cached_keys_positional_args():
+    calls = []
+
+    class Getter:
+        @cached
+        def get(self, level):
+            calls.append(level)
+            return level
+
+    assert Getter().get("Country") == "Country"
+    assert Getter().get("Country") == "Country"
+    assert Getter().get("State / Province") == "State / Province"
+    assert calls == ["Country", "State / Province"]
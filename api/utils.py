@@ -1,19 +1,36 @@
 """API utility functions"""
 # standard modules
+import base64
+import binascii
+import decimal
 import functools
+import hashlib
+import inspect
+import json
 import pathlib
 import urllib3
 import certifi
 import os
 import requests
+import threading
 from datetime import datetime, date
-from typing import Any, Callable, Union
+from enum import Enum
+from io import BytesIO
+from typing import Any, Callable, Iterator, Tuple, Union
 
 # 3rd party modules
-from pony.orm.core import Multiset, SetInstance
+from cachetools import LRUCache, TTLCache
+from fastapi import HTTPException
+from fastapi.responses import JSONResponse
+from pony.orm import count, raw_sql
+from pony.orm.core import Entity, EntityMeta, Multiset, Query, SetInstance
 from pony.orm.ormtypes import TrackedArray
 
 USE_CACHING: bool = os.environ.get("USE_CACHING", "true") == "true"
+CACHE_MAXSIZE: int = int(os.environ.get("CACHE_MAXSIZE", "256"))
+CACHE_TTL: Union[int, None] = (
+    int(os.environ["CACHE_TTL"]) if "CACHE_TTL" in os.environ else None
+)
 
 
 def str_to_date(s: str):
@@ -29,7 +46,12 @@ def str_to_date(s: str):
     datetime.date
 
     """
-    return datetime.strptime(s, "%Y-%m-%d").date()
+    try:
+        return date.fromisoformat(s)
+    except ValueError:
+        # dates without zero padding, e.g., 2020-1-5, are not ISO format but
+        # have always been accepted
+        return datetime.strptime(s, "%Y-%m-%d").date()
 
 
 def date_to_str(dt: date) -> str:
@@ -49,16 +71,21 @@ def download_file(
     fn: str = None,
     write_path: str = None,
     as_object: bool = True,
+    stream: bool = False,
 ):
     """
     Download the PDF at the specified URL and either save it to disk or
-    return the response object.
+    return the response object. If `stream` is True, the response body is
+    not downloaded until it is iterated over, e.g., with `iter_content`.
 
     """
     user_agent = "Mozilla/5.0"
     try:
         response = requests.get(
-            download_url, allow_redirects=True, headers={"user-agent": "Mozilla/5.0"}
+            download_url,
+            allow_redirects=True,
+            headers={"user-agent": "Mozilla/5.0"},
+            stream=stream,
         )
         if response.status_code == 200:
             if as_object:
@@ -73,6 +100,28 @@ def download_file(
         return False
 
 
+def iter_chunks(
+    content: Union[bytes, BytesIO], chunk_size: int = 64 * 1024
+) -> Iterator[bytes]:
+    """Yields the content in chunks of at most `chunk_size` bytes, without
+    copying the content as a whole, e.g., to stream it in a response.
+
+    Args:
+        content (Union[bytes, BytesIO]): The content.
+
+        chunk_size (int, optional): The maximum number of bytes per chunk.
+        Defaults to 64 KiB.
+
+    Yields:
+        Iterator[bytes]: The chunks of the content.
+    """
+    view: memoryview = memoryview(
+        content.getbuffer() if isinstance(content, BytesIO) else content
+    )
+    for start in range(0, len(view), chunk_size):
+        yield bytes(view[start : start + chunk_size])
+
+
 def use_relpath(relpath: str, abspath: str) -> str:
     """Returns the absolute path to the relative path provided
 
@@ -87,10 +136,33 @@ def use_relpath(relpath: str, abspath: str) -> str:
     return path.absolute()
 
 
+def get_cache_key(kwargs: dict) -> str:
+    """Returns a canonical cache key for the keyword arguments, which is the
+    same for arguments that are equal but were built in a different order,
+    e.g., filter dicts whose keys were added in a different order. The key is
+    a fixed-size digest, however large the arguments are.
+
+    Args:
+        kwargs (dict): The keyword arguments of a function call.
+
+    Returns:
+        str: The cache key.
+    """
+    return hashlib.blake2b(
+        json.dumps(kwargs, sort_keys=True, default=str).encode("utf-8"),
+        digest_size=16,
+    ).hexdigest()
+
+
 def cached(func: Callable):
     """Decorator that returns function output if previously generated, as
-    indexed by the concatenated kwargs; otherwise, runs the function and stores
-    the output in the cache indexed by the concatenated kwargs.
+    indexed by the canonical args and kwargs; otherwise, runs the function and
+    stores the output in the cache indexed by the canonical args and kwargs.
+    At most `CACHE_MAXSIZE` outputs are kept per function, with the least
+    recently used evicted first, and if `CACHE_TTL` is defined outputs expire
+    after that many seconds.
+
+    The instance passed to methods as `self` is not part of the cache key.
 
     Args:
         func (Callable): Any function
@@ -98,18 +170,30 @@ def cached(func: Callable):
     Returns:
         Any: The function result, possibly from the cache.
     """
-    cache: dict = {}
+    cache: LRUCache = (
+        LRUCache(maxsize=CACHE_MAXSIZE)
+        if CACHE_TTL is None
+        else TTLCache(maxsize=CACHE_MAXSIZE, ttl=CACHE_TTL)
+    )
+    lock: threading.Lock = threading.Lock()
+    param_names: list = list(inspect.signature(func).parameters)
+    is_method: bool = len(param_names) > 0 and param_names[0] == "self"
 
     @functools.wraps(func)
     def wrapper(*func_args, **kwargs):
         if USE_CACHING:
             random = kwargs.get("random", False)
-            key = str(kwargs)
-            if key in cache and not random:
-                return cache[key]
+            if random:
+                return func(*func_args, **kwargs)
+
+            args = func_args[1:] if is_method else func_args
+            key = get_cache_key({"args": args, "kwargs": kwargs})
+            with lock:
+                if key in cache:
+                    return cache[key]
 
             results = func(*func_args, **kwargs)
-            if not random:
+            with lock:
                 cache[key] = results
             return results
         else:
@@ -130,6 +214,7 @@ def cached(func: Callable):
         #     type = jwt_decoded_json['type']
         # key = str(kwargs) + ':' + type
 
+    wrapper.cache_clear = cache.clear
     return wrapper
 
 
@@ -183,6 +268,339 @@ def is_listlike(obj: Any) -> bool:
     )
 
 
+def pad_in_values(values: list) -> list:
+    """Returns the values padded to the next power of two in length by
+    repeating the last value, so that queries filtering on `in` with lists of
+    different lengths share one translated query in PonyORM's translator
+    cache, which is keyed by the type and length of each list.
+
+    Args:
+        values (list): The values to be matched using `in`.
+
+    Returns:
+        list: The padded values, which match the same records as `values`.
+    """
+    if len(values) == 0:
+        return list(values)
+    padded_len: int = 1 << (len(values) - 1).bit_length()
+    return list(values) + [values[-1]] * (padded_len - len(values))
+
+
+def encode_cursor(order_val: Any, id: int, field: str = None) -> str:
+    """Returns an opaque keyset pagination cursor identifying the last record
+    of a page by the value of its ordering field and its unique ID.
+
+    Args:
+        order_val (Any): The value of the ordering field of the last record.
+
+        id (int): The unique ID of the last record.
+
+        field (str, optional): The ordering field, which is checked when the
+        cursor is decoded. Defaults to None.
+
+    Returns:
+        str: The URL-safe cursor.
+    """
+    payload: list = [order_val, id] if field is None else [order_val, id, field]
+    return base64.urlsafe_b64encode(
+        json.dumps(payload, default=str).encode("utf-8")
+    ).decode("ascii")
+
+
+def decode_cursor(cursor: str, field: str = None) -> Tuple[Any, int]:
+    """Returns the ordering field value and unique ID encoded in a keyset
+    pagination cursor created by `encode_cursor`.
+
+    Args:
+        cursor (str): The cursor.
+
+        field (str, optional): The field the records are ordered by, if the
+        cursor must have been created for that ordering. Defaults to None.
+
+    Raises:
+        ValueError: If the cursor is malformed or was created for another
+        ordering field.
+
+    Returns:
+        Tuple[Any, int]: The ordering field value (as serialized in JSON) and
+        the unique ID of the last record of the previous page.
+    """
+    try:
+        payload: Any = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+    except (binascii.Error, UnicodeError, ValueError):
+        raise ValueError("Malformed cursor: " + cursor)
+    if (
+        not isinstance(payload, list)
+        or len(payload) not in (2, 3)
+        or type(payload[1]) != int
+    ):
+        raise ValueError("Malformed cursor: " + cursor)
+    cursor_field: str = payload[2] if len(payload) == 3 else None
+    if field is not None and cursor_field != field:
+        raise ValueError("Cursor does not match ordering: " + cursor)
+    return payload[0], payload[1]
+
+
+def get_page(
+    q: Query, page: int, pagesize: int, get_count: Callable[[], int] = None
+) -> Tuple[list, int, bool]:
+    """Returns the records on a page of the query, the number of records in
+    the query, and whether there are more pages.
+
+    One record more than the page size is fetched, which determines whether
+    there are more pages, and when the page is the last one the number of
+    records is known without counting them.
+
+    Args:
+        q (Query): The query.
+
+        page (int): The page number, starting at 1.
+
+        pagesize (int): The number of records per page.
+
+        get_count (Callable[[], int], optional): Function returning the number
+        of records in the query, e.g., from a cache, used instead of counting
+        them with the query. Defaults to None.
+
+    Returns:
+        Tuple[list, int, bool]: The records on the page, the number of records
+        in the query, and True if there are more pages.
+    """
+    offset: int = (page - 1) * pagesize
+    records: list = q.limit(pagesize + 1, offset=offset)[:]
+    more_pages: bool = len(records) > pagesize
+    is_last_page: bool = not more_pages and (len(records) > 0 or page == 1)
+    n: int = None
+    if is_last_page:
+        n = offset + len(records)
+    else:
+        n = get_count() if get_count is not None else count(q)
+    return records[:pagesize], n, more_pages
+
+
+def apply_ordering(
+    q: Query,
+    entity_class: EntityMeta,
+    ordering: list,
+    get_ordering_sql: Callable[[str, str], Union[str, None]] = None,
+) -> Query:
+    """Orders the query by the requested fields, with instances lacking a
+    value for a field ordered last and ties broken by unique ID, so the
+    ordering is total and pages never overlap or skip records.
+
+    Args:
+        q (Query): The query to be ordered, whose iteration variable is `i`
+
+        entity_class (EntityMeta): The class representing the entity
+
+        ordering (list): The requested ordering, as a list of field and
+        direction pairs, e.g., `[["date_start_effective", "desc"]]`
+
+        get_ordering_sql (Callable[[str, str], Union[str, None]], optional):
+        Function returning the raw SQL ORDER BY term for a field and
+        direction, or None for fields native to the entity class, e.g., to
+        order by fields of linked entities. Defaults to None.
+
+    Returns:
+        Query: The ordered query
+    """
+    # last call to `order_by` takes precedence, so apply the tie breaker first
+    q = q.order_by(entity_class.id)
+    for field, direction in reversed(ordering):
+        sql: str = None
+        if get_ordering_sql is not None:
+            sql = get_ordering_sql(field, direction)
+        if sql is None:
+            sql = f"""i.{field} {"DESC" if direction == "desc" else "ASC"} NULLS LAST"""
+        q = q.order_by(raw_sql(sql))
+    return q
+
+
+def get_keyset_ordering(entity_class: EntityMeta, ordering: list) -> Tuple[str, str]:
+    """Returns the field and direction by which instances of the entity class
+    are ordered when using keyset (cursor) pagination. Ties are broken by the
+    unique ID of the instances.
+
+    Args:
+        entity_class (EntityMeta): The class representing the entity
+
+        ordering (list): The requested ordering, as a list of field and
+        direction pairs, e.g., `[["date_start_effective", "desc"]]`
+
+    Raises:
+        HTTPException: If the ordering is not on a single, scalar field native
+        to the entity class, which keyset pagination requires.
+
+    Returns:
+        Tuple[str, str]: The field and direction ("asc" or "desc"). If no
+        ordering was requested the unique ID is used, ascending.
+    """
+    if len(ordering) == 0:
+        return "id", "asc"
+    elif len(ordering) > 1:
+        raise HTTPException(
+            status_code=400,
+            detail="Cursor pagination supports ordering by one field only",
+        )
+    field, direction = ordering[0]
+    attr: Any = getattr(entity_class, field, None)
+    if "." in field or attr is None or attr.py_type not in (int, float, str, date):
+        raise HTTPException(
+            status_code=400,
+            detail="Cursor pagination does not support ordering by " + field,
+        )
+    return field, direction
+
+
+def is_keyset_ordering(entity_class: EntityMeta, ordering: list) -> bool:
+    """Returns True if instances of the entity class can be paginated with
+    keyset (cursor) pagination given the requested ordering, False otherwise.
+
+    Args:
+        entity_class (EntityMeta): The class representing the entity
+
+        ordering (list): The requested ordering, as a list of field and
+        direction pairs, e.g., `[["date_start_effective", "desc"]]`
+
+    Returns:
+        bool: True if the ordering is supported by keyset pagination.
+    """
+    try:
+        get_keyset_ordering(entity_class, ordering)
+        return True
+    except HTTPException:
+        return False
+
+
+def apply_keyset_pagination(
+    q: Query, entity_class: EntityMeta, ordering: list, cursor: str
+) -> Query:
+    """Orders the query for keyset (cursor) pagination and keeps only the
+    instances that come after the instance identified by the cursor.
+
+    The query is ordered as by `apply_ordering`, so the first page is the
+    same as when paginating with page numbers.
+
+    Args:
+        q (Query): The query to be paginated, consisting of one unjoined
+        entity whose iteration variable is `i`
+
+        entity_class (EntityMeta): The class representing the entity
+
+        ordering (list): The requested ordering, as a list of field and
+        direction pairs, e.g., `[["date_start_effective", "desc"]]`
+
+        cursor (str): The cursor returned with the previous page, if any.
+
+    Raises:
+        HTTPException: If the ordering is not supported or the cursor is
+        malformed or was returned for another ordering.
+
+    Returns:
+        Query: The ordered query with the cursor filter applied
+    """
+    field, direction = get_keyset_ordering(entity_class, ordering)
+    q = apply_ordering(q, entity_class, ordering)
+
+    # if first page, there is no cursor to apply
+    if cursor is None:
+        return q
+
+    # decode the ordering field value and ID of the last instance returned
+    order_val: Any = None
+    last_id: int = None
+    try:
+        order_val, last_id = decode_cursor(cursor, field=field)
+        if order_val is not None:
+            py_type: type = getattr(entity_class, field).py_type
+            order_val = (
+                str_to_date(order_val) if py_type == date else py_type(order_val)
+            )
+    except (TypeError, ValueError):
+        raise HTTPException(status_code=400, detail="Malformed cursor: " + cursor)
+
+    # keep only the instances that come after the last instance returned
+    if field == "id":
+        if direction == "desc":
+            q = q.filter(lambda i: i.id < last_id)
+        else:
+            q = q.filter(lambda i: i.id > last_id)
+    elif order_val is None:
+        q = q.filter(lambda i: getattr(i, field) is None and i.id > last_id)
+    elif direction == "desc":
+        q = q.filter(
+            lambda i: getattr(i, field) < order_val
+            or (getattr(i, field) == order_val and i.id > last_id)
+            or getattr(i, field) is None
+        )
+    else:
+        q = q.filter(
+            lambda i: getattr(i, field) > order_val
+            or (getattr(i, field) == order_val and i.id > last_id)
+            or getattr(i, field) is None
+        )
+    return q
+
+
+def get_next_cursor(instance: Entity, field: str) -> str:
+    """Returns the keyset pagination cursor identifying the instance as the
+    last one returned in a page.
+
+    Args:
+        instance (Entity): The last instance of the page
+
+        field (str): The field by which the instances are ordered
+
+    Returns:
+        str: The cursor
+    """
+    return encode_cursor(getattr(instance, field), instance.id, field)
+
+
+def to_json_default(obj: Any) -> Any:
+    """Returns a JSON-serializable version of objects the `json` module cannot
+    serialize, encoded the same way FastAPI's `jsonable_encoder` encodes them.
+
+    Args:
+        obj (Any): The object.
+
+    Raises:
+        TypeError: If the object is not supported.
+
+    Returns:
+        Any: The JSON-serializable version of the object.
+    """
+    if isinstance(obj, (date, datetime)):
+        return obj.isoformat()
+    elif isinstance(obj, Enum):
+        return obj.value
+    elif isinstance(obj, decimal.Decimal):
+        return float(obj)
+    elif isinstance(obj, (set, frozenset)) or is_listlike(obj):
+        return list(obj)
+    elif hasattr(obj, "dict"):
+        return obj.dict()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+class DataJSONResponse(JSONResponse):
+    """JSON response that serializes its content directly with the `json`
+    module, for endpoints returning large lists of records that are already
+    shaped like their response model, which would otherwise be validated
+    against that model and encoded with `jsonable_encoder` record by record.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return json.dumps(
+            content,
+            ensure_ascii=False,
+            allow_nan=False,
+            indent=None,
+            separators=(",", ":"),
+            default=to_json_default,
+        ).encode("utf-8")
+
+
 def get_today_datetime_stamp() -> str:
     today: datetime = datetime.today()
     return today.strftime("%Y-%m-%d %H:%M:%S %Z").strip()
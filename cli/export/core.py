@@ -1,9 +1,9 @@
 import shutil
+from io import BytesIO
 from typing import Union
 from datetime import date
 
 import click
-from fastapi.responses import Response
 
 
 @click.command(help="Download the full dataset and summary dataset as Excel files")
@@ -42,11 +42,11 @@ def export(filename: Union[str, None], brief: bool, save_static: bool):
         raise ValueError("Cannot specify `--filename` if using `--save-static`")
 
     db.generate_mapping(create_tables=False)
-    excel_response: Response = core.export(
+    excel_content: BytesIO = core.get_export_content(
         filters=dict(),
         class_name="All_data_recreate" if not brief else "All_data_recreate_summary",
     )
-    if excel_response is None:
+    if excel_content is None:
         raise ValueError(
             "Something went wrong when preparing the Excel sheet response. Please"
             " contact a developer for assistance."
@@ -54,7 +54,7 @@ def export(filename: Union[str, None], brief: bool, save_static: bool):
 
     if filename is not None:
         with open(filename, "wb") as f:
-            f.write(excel_response.body)
+            f.write(excel_content.getbuffer())
 
     if save_static:
         STATIC_EXCEL_FN_BASE: str = "staticfull" if not brief else "staticsummary"
@@ -67,7 +67,7 @@ def export(filename: Union[str, None], brief: bool, save_static: bool):
 
         # replace api/methods/excelexport/data/static*.xlsx
         with open(STATIC_EXCEL_PATH, "wb") as f:
-            f.write(excel_response.body)
+            f.write(excel_content.getbuffer())
 
         # make backup copy
         shutil.copy(
@@ -2,7 +2,9 @@
 # standard modules
 import datetime
 import json
+from collections import defaultdict
 from datetime import date
+from typing import DefaultDict
 
 # 3rd party modules
 from pony.orm import (
@@ -15,6 +17,7 @@ from pony.orm import (
     db_session,
     IntArray,
 )
+from pony.orm.core import Query
 
 from ingest import awss3
 
@@ -45,6 +48,23 @@ def custom_delete(entity_class, records):
     return len(to_delete)
 
 
+def get_linked_by_id(q: Query) -> DefaultDict[int, list]:
+    """Given a query selecting pairs of instance IDs and instances linked to
+    them, returns the linked instances indexed by instance ID, each list sorted
+    by the linked instances' IDs as `to_dict` would.
+
+    Args:
+        q (Query): The query selecting (instance ID, linked instance) pairs.
+
+    Returns:
+        DefaultDict[int, list]: The linked instances indexed by instance ID.
+    """
+    linked_by_id: DefaultDict[int, list] = defaultdict(list)
+    for id, linked_instance in sorted(q[:], key=lambda x: (x[0], x[1].id)):
+        linked_by_id[id].append(linked_instance)
+    return linked_by_id
+
+
 class File(db.Entity):
     """Supporting documentation."""
 
@@ -272,6 +292,109 @@ class Policy(db.Entity):
             del instance_dict["court_challenges"]
         return instance_dict
 
+    def to_dicts_2(instances, return_fields_by_entity: dict = dict()):
+        """Converts instances of this entity class to dictionaries as
+        `to_dict_2` does, but loads the linked entities of all instances with
+        one query per linked entity instead of several queries per instance.
+
+        Parameters
+        ----------
+        instances : list
+            The instances to convert.
+        return_fields_by_entity : dict
+            The fields that should be returned for this entity and linked
+            entities, indexed by entity name.
+
+        Returns
+        -------
+        list
+            The dictionaries, in the same order as `instances`.
+
+        """
+        # split fields to return into native fields and linked entities
+        only = return_fields_by_entity.get("policy", ())
+        linked_fields = ("place", "auth_entity", "file", "court_challenges")
+        only_native = [f for f in only if f not in linked_fields]
+        only_linked = [f for f in only if f in linked_fields]
+
+        # if requested, return only certain fields for certain linked entities,
+        # ensuring id field is always returned
+        only_place = return_fields_by_entity.get("place", ())
+        only_challenge = return_fields_by_entity.get("court_challenges", ())
+        only_auth_entity = return_fields_by_entity.get("auth_entity", ())
+        if len(only_place) > 0:
+            only_place = tuple(set(only_place) | {"id"})
+        if len(only_challenge) > 0:
+            only_challenge = tuple(set(only_challenge) | {"id"})
+
+        # load linked entities of all instances, indexed by instance ID
+        # padded so Pony can reuse translated queries for similar batch sizes;
+        # imported here since importing `api` imports this module
+        from api.utils import pad_in_values
+
+        ids = pad_in_values([i.id for i in instances])
+        linked_by_field = dict()
+        if "place" in only_linked:
+            linked_by_field["place"] = get_linked_by_id(
+                select(
+                    (i.id, t)
+                    for i in Policy
+                    for t in i.place
+                    if i.id in ids and t.level != "Local plus state/province"
+                )
+            )
+        if "court_challenges" in only_linked:
+            linked_by_field["court_challenges"] = get_linked_by_id(
+                select(
+                    (i.id, t) for i in Policy for t in i.court_challenges if i.id in ids
+                )
+            )
+        if "auth_entity" in only_linked:
+            linked_by_field["auth_entity"] = get_linked_by_id(
+                select(
+                    (i.id, t) for i in Policy for t in i.auth_entity if i.id in ids
+                ).prefetch(Auth_Entity.place)
+            )
+        if "file" in only_linked:
+            linked_by_field["file"] = get_linked_by_id(
+                select((i.id, t) for i in Policy for t in i.file if i.id in ids)
+            )
+
+        # convert each instance, converting each linked instance only once
+        auth_entity_dicts = dict()
+        instance_dicts = list()
+        for instance in instances:
+            if len(only) == 0:
+                instance_dict = Policy.to_dict(instance)
+            elif len(only_native) > 0:
+                instance_dict = Policy.to_dict(instance, only=only_native)
+            else:
+                instance_dict = dict()
+
+            for k in only_linked:
+                linked_instances = linked_by_field[k][instance.id]
+                if k == "place":
+                    instance_dict[k] = [
+                        t.to_dict(only=only_place) for t in linked_instances
+                    ]
+                elif k == "court_challenges":
+                    if len(linked_instances) > 0:
+                        instance_dict[k] = [
+                            t.to_dict(only=only_challenge) for t in linked_instances
+                        ]
+                elif k == "auth_entity":
+                    instance_dict[k] = list()
+                    for t in linked_instances:
+                        if t.id not in auth_entity_dicts:
+                            auth_entity_dicts[t.id] = t.to_dict_2(
+                                only=only_auth_entity, only_place=only_place
+                            )
+                        instance_dict[k].append(auth_entity_dicts[t.id])
+                elif k == "file":
+                    instance_dict[k] = [t.id for t in linked_instances]
+            instance_dicts.append(instance_dict)
+        return instance_dicts
+
 
 class Version(db.Entity):
     _table_ = "version"
@@ -280,6 +403,44 @@ class Version(db.Entity):
     date = Required(date)
     last_datum_date = Optional(datetime.date)
     map_types = Required(str)
+    updated_at = Optional(datetime.datetime)
+
+    @classmethod
+    def get_last_update(cls, name: str = "Policy data") -> datetime.datetime:
+        """Returns the time the data of the given type were last ingested,
+        which changes with every ingest, including several ingests on the
+        same day.
+
+        By default this is the policy data, which include plans and court
+        challenges, so that ingesting caseload data does not expire responses
+        built from the policy data only.
+
+        Versions written before `updated_at` was recorded count as updated at
+        the start of their date.
+
+        Parameters
+        ----------
+        name : str
+            The name of the versions of the type of data.
+
+        Returns
+        -------
+        datetime.datetime
+            The latest update time of the versions with the name, or None if
+            there are none.
+
+        """
+        stamps: list = [
+            (
+                updated_at
+                if updated_at is not None
+                else datetime.datetime.combine(version_date, datetime.time.min)
+            )
+            for version_date, updated_at in select(
+                (i.date, i.updated_at) for i in cls if i.name == name
+            )
+        ]
+        return max(stamps) if len(stamps) > 0 else None
 
 
 class Metadata(db.Entity):
@@ -471,6 +632,70 @@ class Plan(db.Entity):
                     instance_dict["file"].append(doc_instance_dict["id"])
         return instance_dict
 
+    def to_dicts_2(instances, return_fields_by_entity: dict = dict()):
+        """Converts instances of this entity class to dictionaries as
+        `to_dict_2` does, but loads the linked entities of all instances with
+        one query per linked entity instead of several queries per instance.
+
+        Parameters
+        ----------
+        instances : list
+            The instances to convert.
+        return_fields_by_entity : dict
+            The fields that should be returned for this entity, indexed by
+            entity name.
+
+        Returns
+        -------
+        list
+            The dictionaries, in the same order as `instances`.
+
+        """
+        # split fields to return into native fields and linked entities
+        only = return_fields_by_entity.get("plan", ())
+        linked_fields = ("place", "auth_entity", "file")
+        only_native = [f for f in only if f not in linked_fields]
+        only_linked = [f for f in only if f in linked_fields]
+
+        # load linked entities of all instances, indexed by instance ID
+        # padded so Pony can reuse translated queries for similar batch sizes;
+        # imported here since importing `api` imports this module
+        from api.utils import pad_in_values
+
+        ids = pad_in_values([i.id for i in instances])
+        linked_by_field = dict()
+        if "place" in only_linked:
+            linked_by_field["place"] = get_linked_by_id(
+                select((i.id, t) for i in Plan for t in i.place if i.id in ids)
+            )
+        if "auth_entity" in only_linked:
+            linked_by_field["auth_entity"] = get_linked_by_id(
+                select((i.id, t) for i in Plan for t in i.auth_entity if i.id in ids)
+            )
+        if "file" in only_linked:
+            linked_by_field["file"] = get_linked_by_id(
+                select((i.id, t) for i in Plan for t in i.file if i.id in ids)
+            )
+
+        # convert each instance
+        instance_dicts = list()
+        for instance in instances:
+            if len(only) == 0:
+                instance_dict = Plan.to_dict(instance)
+            elif len(only_native) > 0:
+                instance_dict = Plan.to_dict(instance, only=only_native)
+            else:
+                instance_dict = dict()
+
+            for k in only_linked:
+                linked_instances = linked_by_field[k][instance.id]
+                if k == "file":
+                    instance_dict[k] = [t.id for t in linked_instances]
+                else:
+                    instance_dict[k] = [t.to_dict() for t in linked_instances]
+            instance_dicts.append(instance_dict)
+        return instance_dicts
+
 
 class PolicyCountsByPlace(db.Entity):
     level = Optional(str)
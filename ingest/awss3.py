@@ -1,5 +1,6 @@
 """COVID AMP-specific Amazon Web Services S3 functions"""
 
+import functools
 import logging
 from typing import cast
 
@@ -9,18 +10,24 @@ from pony.orm import db_session, commit
 
 from ingest.util import download_file
 
-# define S3 client used for adding / checking for files in the S3
-# storage bucket
-s3 = boto3.client("s3")
 S3_BUCKET_NAME = "covid-npi-policy-files"
+EXPORT_S3_PREFIX = "exports/"
 
 logger = logging.getLogger(__name__)
 
 
+@functools.lru_cache(maxsize=1)
+def get_s3_client():
+    """Returns the S3 client used for adding / checking for files in the S3
+    storage bucket, creating it on first use rather than on import."""
+    return boto3.client("s3")
+
+
 def get_s3_bucket_keys():
-    """Return all file keys, i.e., filenames, in `S3_BUCKET_NAME`"""
+    """Return set of all file keys, i.e., filenames, in `S3_BUCKET_NAME`, so
+    files can be checked against it without a request per file"""
     nextContinuationToken = None
-    keys = list()
+    keys = set()
     more_keys = True
 
     # while there are still more keys to retrieve from the bucket
@@ -29,14 +36,14 @@ def get_s3_bucket_keys():
         # use continuation token if it is defined
         response = None
         if nextContinuationToken is not None:
-            response = s3.list_objects_v2(
+            response = get_s3_client().list_objects_v2(
                 Bucket=S3_BUCKET_NAME,
                 ContinuationToken=nextContinuationToken,
             )
 
         # otherwise it is the first request for keys, so do not include it
         else:
-            response = s3.list_objects_v2(
+            response = get_s3_client().list_objects_v2(
                 Bucket=S3_BUCKET_NAME,
             )
 
@@ -48,19 +55,38 @@ def get_s3_bucket_keys():
             nextContinuationToken = None
 
         # for each response object, extract the key and add it to the
-        # full list
+        # full set
         if response["KeyCount"] == 0:
-            return list()
+            return set()
         for d in response["Contents"]:
-            keys.append(d["Key"])
+            keys.add(d["Key"])
 
         # are there more keys to pull from the bucket?
         more_keys = nextContinuationToken is not None
 
-    # return master list of all bucket keys
+    # return master set of all bucket keys
     return keys
 
 
+def delete_s3_bucket_keys(prefix: str):
+    """Deletes all files in `S3_BUCKET_NAME` whose keys start with the prefix,
+    e.g., cached exports that are out of date. Errors are logged but not
+    raised, since the files are only a cache."""
+    try:
+        paginator = get_s3_client().get_paginator("list_objects_v2")
+        for page in paginator.paginate(Bucket=S3_BUCKET_NAME, Prefix=prefix):
+            objects: list = [{"Key": d["Key"]} for d in page.get("Contents", [])]
+
+            # at most 1000 keys are listed per page, as many as can be deleted
+            # in one request
+            if len(objects) > 0:
+                get_s3_client().delete_objects(
+                    Bucket=S3_BUCKET_NAME, Delete={"Objects": objects, "Quiet": True}
+                )
+    except Exception as e:
+        logger.exception(e)
+
+
 @db_session
 def add_file_to_s3_if_missing(file, s3_bucket_keys):
     file_key = file.filename
@@ -89,7 +115,7 @@ def add_file_to_s3_if_missing(file, s3_bucket_keys):
 
             # otherwise, assume PDF (do nothing, handled earlier)
             print(
-                s3.put_object(
+                get_s3_client().put_object(
                     Body=file_res_obj.content,
                     Bucket=S3_BUCKET_NAME,
                     Key=file_key,
@@ -251,6 +251,7 @@ def upsert_jhu_country_covid_data(
             "map_types": "{global}",
             "date": date.today(),
             "last_datum_date": last_datum_date,
+            "updated_at": datetime.now(),
         },
     )
 
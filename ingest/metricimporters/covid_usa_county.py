@@ -289,6 +289,7 @@ def upsert_nyt_county_covid_data(
             "map_types": "{us-county,us-county-plus-state}",
             "date": date.today(),
             "last_datum_date": last_datum_date,
+            "updated_at": datetime.now(),
         },
     )
 
@@ -245,6 +245,7 @@ def upsert_nyt_state_covid_data(
             "map_types": "{us,us-county,us-county-plus-state}",
             "date": date.today(),
             "last_datum_date": last_datum_date,
+            "updated_at": datetime.now(),
         },
     )
 
@@ -259,6 +260,7 @@ def upsert_nyt_state_covid_data(
             "map_types": "{}",
             "date": date.today(),
             "last_datum_date": last_datum_date,
+            "updated_at": datetime.now(),
         },
     )
 
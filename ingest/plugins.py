@@ -712,9 +712,14 @@ class CovidPolicyPlugin(IngestPlugin):
             },
             {
                 "date": date.today(),
+                "updated_at": datetime.now(),
             },
         )
 
+        # delete XLSX exports built from the previous version of the data,
+        # which are keyed by its update time and will not be served again
+        awss3.delete_s3_bucket_keys(prefix=awss3.EXPORT_S3_PREFIX)
+
         logger.info("\nData ingest completed.")
         return self
 
@@ -0,0 +1,5 @@
+-- time each type of data was last ingested, which versions cached API
+-- responses (see `Version.get_last_update` in `db/models.py`); must be run on
+-- existing databases before starting the API server, which checks that the
+-- columns of its models exist
+alter table version add column if not exists updated_at timestamp;
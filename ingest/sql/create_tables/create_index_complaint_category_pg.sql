@@ -0,0 +1,4 @@
+-- index used to filter court challenges by complaint category with the array
+-- contains operator `@>` (see `apply_entity_filters` in `api/core.py`)
+create index if not exists court_challenge_complaint_category_idx
+on court_challenge using gin (complaint_category);
@@ -0,0 +1,5 @@
+-- index used to get the latest observation of each place on or before a date
+-- with `distinct on (place) ... order by place, date desc` (see
+-- `get_policy_status` and `get_lockdown_level` in `api/core.py`)
+create index if not exists observation_place_date_desc_idx
+on observation (place, date desc);
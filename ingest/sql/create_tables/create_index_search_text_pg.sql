@@ -0,0 +1,15 @@
+-- trigram indexes used by the `text` filter to match search text in the
+-- database (see `apply_trigram_text_filter` in `api/core.py`)
+create extension if not exists pg_trgm;
+
+create index if not exists policy_search_text_trgm_idx
+on policy using gin (search_text gin_trgm_ops);
+
+create index if not exists plan_search_text_trgm_idx
+on plan using gin (search_text gin_trgm_ops);
+
+create index if not exists court_challenge_search_text_trgm_idx
+on court_challenge using gin (search_text gin_trgm_ops);
+
+create index if not exists policy_number_search_text_trgm_idx
+on policy_number using gin (search_text gin_trgm_ops);
@@ -10,4 +10,5 @@ create materialized view policy_date as (
 );
 create index policy_date_fk_policy_id_idx on policy_date (fk_policy_id);
 create index policy_date_start_date_idx on policy_date (start_date);
-create index policy_date_end_date_idx on policy_date (end_date);
\ No newline at end of file
+create index policy_date_end_date_idx on policy_date (end_date);
+create index policy_date_fk_policy_id_dates_idx on policy_date (fk_policy_id, start_date, end_date);